@@ -9,4 +9,7 @@ app = Celery('config')
 app.config_from_object('django.conf:settings', namespace='CELERY')
 
 # Load task modules from all registered Django apps.
-app.autodiscover_tasks()
\ No newline at end of file
+app.autodiscover_tasks()
+
+# Подключает сбор длительности задач для /metrics/
+import config.metrics  # noqa: E402,F401
\ No newline at end of file
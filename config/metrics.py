@@ -0,0 +1,341 @@
+import hmac
+import json
+import logging
+import threading
+import time
+from collections import Counter as CounterDict
+from collections import defaultdict
+from contextlib import contextmanager
+
+import redis
+from celery.signals import task_postrun, task_prerun
+from django.conf import settings
+from django.http import Http404, HttpResponse
+
+logger = logging.getLogger(__name__)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+
+class LocalMetricsStore:
+    """
+    Хранилище метрик в памяти процесса.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.data = defaultdict(CounterDict)
+
+    def increment(self, name, values):
+        with self.lock:
+            self.data[name].update(values)
+
+    def read(self, name):
+        with self.lock:
+            return dict(self.data[name])
+
+    def clear(self):
+        with self.lock:
+            self.data.clear()
+
+
+class RedisMetricsStore:
+    """
+    Хранилище метрик в Redis: значения одной метрики лежат в одном хэше,
+    поэтому веб-процессы и воркеры Celery публикуют общие значения.
+    """
+
+    prefix = "metrics:"
+
+    def __init__(self, url):
+        self.client = redis.Redis.from_url(
+            url,
+            socket_timeout=settings.METRICS_REDIS_TIMEOUT,
+            socket_connect_timeout=settings.METRICS_REDIS_TIMEOUT,
+        )
+
+    def increment(self, name, values):
+        pipeline = self.client.pipeline(transaction=False)
+        for field, amount in values.items():
+            pipeline.hincrbyfloat(self.prefix + name, field, amount)
+        pipeline.execute()
+
+    def read(self, name):
+        return {
+            field.decode(): float(value)
+            for field, value in self.client.hgetall(self.prefix + name).items()
+        }
+
+    def clear(self):
+        keys = list(self.client.scan_iter(f"{self.prefix}*"))
+        if keys:
+            self.client.delete(*keys)
+
+
+class MetricsRegistry:
+    """
+    Реестр метрик с выводом в текстовом формате Prometheus.
+
+    Если задан CACHE_LOCATION, значения хранятся в том же Redis, иначе
+    в памяти процесса. Ошибки хранилища не прерывают обработку запросов:
+    обращения к Redis ограничены METRICS_REDIS_TIMEOUT, а после ошибки запись
+    метрик пропускается METRICS_REDIS_RETRY_INTERVAL секунд.
+    """
+
+    def __init__(self):
+        self.metrics = []
+        self._store = None
+        self._paused_until = 0.0
+
+    @property
+    def store(self):
+        if self._store is None:
+            location = settings.CACHES["default"].get("LOCATION")
+            if location and location.startswith(("redis://", "rediss://")):
+                self._store = RedisMetricsStore(location)
+            else:
+                self._store = LocalMetricsStore()
+        return self._store
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def increment(self, name, values):
+        if time.monotonic() < self._paused_until:
+            return
+        try:
+            self.store.increment(name, values)
+        except redis.RedisError:
+            self._paused_until = (
+                time.monotonic() + settings.METRICS_REDIS_RETRY_INTERVAL
+            )
+            logger.warning(
+                "Failed to record metric %s, recording paused for %s s",
+                name,
+                settings.METRICS_REDIS_RETRY_INTERVAL,
+                exc_info=True,
+            )
+
+    def read(self, name):
+        try:
+            return self.store.read(name)
+        except redis.RedisError:
+            logger.warning("Failed to read metric %s", name, exc_info=True)
+            return {}
+
+    def clear(self):
+        self.store.clear()
+
+    def render(self):
+        return "".join(metric.render() for metric in self.metrics)
+
+
+registry = MetricsRegistry()
+
+
+def format_labels(labels):
+    escaped = (
+        (name, str(value).replace("\\", r"\\").replace('"', r"\"").replace("\n", r"\n"))
+        for name, value in labels
+    )
+    return "{" + ",".join(f'{name}="{value}"' for name, value in escaped) + "}"
+
+
+def format_value(value):
+    return str(int(value)) if float(value).is_integer() else repr(value)
+
+
+class Metric:
+    type = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        registry.register(self)
+
+    def label_values(self, labels):
+        return [str(labels[name]) for name in self.labelnames]
+
+    def field(self, labels, part):
+        return json.dumps([*self.label_values(labels), part])
+
+    def read_series(self):
+        """
+        Возвращает {значения меток: {часть: значение}} из хранилища.
+        """
+        series = defaultdict(dict)
+        for field, value in registry.read(self.name).items():
+            *label_values, part = json.loads(field)
+            series[tuple(label_values)][part] = value
+        return sorted(series.items())
+
+    def header(self):
+        return (
+            f"# HELP {self.name} {self.documentation}\n"
+            f"# TYPE {self.name} {self.type}\n"
+        )
+
+
+class Counter(Metric):
+    type = "counter"
+
+    def inc(self, amount=1, **labels):
+        registry.increment(self.name, {self.field(labels, "value"): amount})
+
+    def render(self):
+        lines = [self.header()]
+        for label_values, parts in self.read_series():
+            labels = format_labels(zip(self.labelnames, label_values))
+            lines.append(f"{self.name}{labels} {format_value(parts['value'])}\n")
+        return "".join(lines)
+
+
+class Histogram(Metric):
+    type = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, **labels):
+        """
+        Учитывает наблюдение одним обращением к хранилищу: увеличивается
+        только счётчик первой подходящей корзины, накопленные значения
+        вычисляются при выводе.
+        """
+        bucket = next((str(bound) for bound in self.buckets if value <= bound), "+Inf")
+        registry.increment(
+            self.name,
+            {self.field(labels, bucket): 1, self.field(labels, "sum"): value},
+        )
+
+    def render(self):
+        lines = [self.header()]
+        for label_values, parts in self.read_series():
+            labels = list(zip(self.labelnames, label_values))
+            cumulative = 0
+            for bound in (*map(str, self.buckets), "+Inf"):
+                cumulative += parts.get(bound, 0)
+                bucket_labels = format_labels([*labels, ("le", bound)])
+                lines.append(
+                    f"{self.name}_bucket{bucket_labels} {format_value(cumulative)}\n"
+                )
+            lines.append(
+                f"{self.name}_sum{format_labels(labels)} "
+                f"{format_value(parts.get('sum', 0))}\n"
+            )
+            lines.append(
+                f"{self.name}_count{format_labels(labels)} {format_value(cumulative)}\n"
+            )
+        return "".join(lines)
+
+
+REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds",
+    "Время обработки HTTP-запроса по маршруту",
+    ("route", "method", "status"),
+)
+TASK_DURATION = Histogram(
+    "celery_task_duration_seconds",
+    "Время выполнения задач Celery по итоговому состоянию",
+    ("task", "state"),
+)
+EXTERNAL_CALL_DURATION = Histogram(
+    "external_call_duration_seconds",
+    "Время обращений к внешним сервисам",
+    ("service", "operation", "outcome"),
+)
+EXTERNAL_CALL_ERRORS = Counter(
+    "external_call_errors_total",
+    "Количество ошибок обращений к внешним сервисам",
+    ("service", "operation"),
+)
+
+COURSE_CACHE_REQUESTS = Counter(
+    "course_cache_requests_total",
+    "Обращения к кэшу представлений курсов: local_hit, shared_hit или miss",
+    ("result",),
+)
+COURSE_UPDATE_EMAILS = Counter(
+    "course_update_emails_total",
+    "Письма об обновлении курсов по результату отправки: sent или failed",
+    ("outcome",),
+)
+COURSE_UPDATE_EMAIL_RATE = Histogram(
+    "course_update_emails_per_second",
+    "Скорость отправки писем об обновлении курса в одной пачке",
+    buckets=(1, 5, 10, 25, 50, 100, 250, 500, 1000),
+)
+COURSE_UPDATE_CHUNK_FAILURES = Histogram(
+    "course_update_email_chunk_failures",
+    "Количество неотправленных писем в одной пачке рассылки",
+    buckets=(0, 1, 5, 10, 25, 50, 100),
+)
+
+
+@contextmanager
+def observe_external_call(service, operation):
+    """
+    Измеряет обращение к внешнему сервису и считает ошибки.
+    """
+    start = time.perf_counter()
+    outcome = "error"
+    try:
+        yield
+        outcome = "success"
+    except Exception:
+        EXTERNAL_CALL_ERRORS.inc(service=service, operation=operation)
+        raise
+    finally:
+        EXTERNAL_CALL_DURATION.observe(
+            time.perf_counter() - start,
+            service=service,
+            operation=operation,
+            outcome=outcome,
+        )
+
+
+_task_started = {}
+
+
+@task_prerun.connect
+def task_started(task_id=None, **kwargs):
+    _task_started[task_id] = time.perf_counter()
+
+
+@task_postrun.connect
+def task_finished(task_id=None, task=None, state=None, **kwargs):
+    start = _task_started.pop(task_id, None)
+    if start is not None:
+        TASK_DURATION.observe(
+            time.perf_counter() - start, task=task.name, state=state or "UNKNOWN"
+        )
+
+
+def is_metrics_access_allowed(request):
+    """
+    Проверяет доступ к метрикам: токен METRICS_TOKEN в заголовке Authorization,
+    сессия сотрудника или адрес из METRICS_ALLOWED_IPS.
+    """
+    token = settings.METRICS_TOKEN
+    authorization = request.headers.get("Authorization", "")
+    if token and hmac.compare_digest(
+        authorization.encode(), f"Bearer {token}".encode()
+    ):
+        return True
+    if request.user.is_authenticated and request.user.is_staff:
+        return True
+    return request.META.get("REMOTE_ADDR") in settings.METRICS_ALLOWED_IPS
+
+
+def metrics_view(request):
+    """
+    Отдаёт метрики в текстовом формате Prometheus. Без доступа отвечает 404,
+    чтобы не раскрывать наличие эндпоинта.
+    """
+    if not is_metrics_access_allowed(request):
+        raise Http404
+    return HttpResponse(registry.render(), content_type=CONTENT_TYPE)
@@ -0,0 +1,195 @@
+import cProfile
+import io
+import logging
+import pstats
+import time
+from collections import Counter
+from contextlib import ExitStack
+from pathlib import Path
+
+from django.conf import settings
+from django.db import connections
+from django.http import HttpResponse
+from django.utils import timezone
+from rest_framework.exceptions import AuthenticationFailed
+
+from config.metrics import REQUEST_DURATION
+from users.authentication import CachedJWTAuthentication
+
+logger = logging.getLogger(__name__)
+
+
+class QueryStats:
+    """
+    Обёртка выполнения SQL для connection.execute_wrapper: считает запросы,
+    их суммарное время и повторы одинаковых запросов.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.statements = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - start
+            self.count += 1
+            self.statements[sql] += 1
+
+
+class QueryTimingMiddleware:
+    """
+    Измеряет время обработки запроса, время SQL и время рендеринга ответа.
+
+    Добавляет заголовок Server-Timing (db, serialize, total) и учитывает время
+    в гистограмме http_request_duration_seconds по имени маршрута. Запросы
+    дольше SLOW_REQUEST_THRESHOLD_MS логируются вместе с самыми
+    повторяющимися SQL-запросами, что позволяет находить N+1 без DEBUG=True.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        stats = QueryStats()
+        start = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(stats))
+            response = self.get_response(request)
+        total = time.perf_counter() - start
+        render = getattr(request, "_render_duration", 0.0)
+
+        response["Server-Timing"] = (
+            f'db;dur={stats.duration * 1000:.1f};desc="{stats.count} queries", '
+            f"serialize;dur={render * 1000:.1f}, "
+            f"total;dur={total * 1000:.1f}"
+        )
+        resolver_match = request.resolver_match
+        REQUEST_DURATION.observe(
+            total,
+            route=resolver_match.view_name if resolver_match else "unmatched",
+            method=request.method,
+            status=response.status_code,
+        )
+        if total * 1000 >= settings.SLOW_REQUEST_THRESHOLD_MS:
+            self.log_slow_request(request, response, stats, total)
+        return response
+
+    def process_template_response(self, request, response):
+        """
+        Оборачивает render() ответа DRF, чтобы измерить время сериализации
+        данных в JSON.
+        """
+        render = response.render
+
+        def timed_render():
+            start = time.perf_counter()
+            try:
+                return render()
+            finally:
+                request._render_duration = time.perf_counter() - start
+
+        response.render = timed_render
+        return response
+
+    def log_slow_request(self, request, response, stats, total):
+        repeated = [f"{count}x {sql}" for sql, count in stats.statements.most_common(3)]
+        logger.warning(
+            "Slow request %s %s: %d, %.1f ms, %d queries in %.1f ms. "
+            "Most repeated SQL: %s",
+            request.method,
+            request.get_full_path(),
+            response.status_code,
+            total * 1000,
+            stats.count,
+            stats.duration * 1000,
+            "; ".join(repeated) or "-",
+            extra={
+                "duration_ms": total * 1000,
+                "db_queries": stats.count,
+                "db_duration_ms": stats.duration * 1000,
+            },
+        )
+
+
+class ProfilingMiddleware:
+    """
+    Профилирование отдельных запросов персонала через cProfile.
+
+    Включается параметром ?profile= или заголовком X-Profile со значением
+    text (или 1) — вместо ответа возвращается текстовый отчёт pstats, либо
+    file — профиль сохраняется в PROFILING_DIR, а путь передаётся в заголовке
+    X-Profile-File. В профиль попадает весь путь обработки запроса ниже
+    middleware: аутентификация, права, представление, сериализация и рендеринг.
+    Без флага запрос обрабатывается без дополнительных действий, а JWT
+    проверяется только при наличии флага.
+    """
+
+    query_param = "profile"
+    header = "X-Profile"
+    text_modes = ("1", "text")
+    file_mode = "file"
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        mode = request.GET.get(self.query_param) or request.headers.get(self.header)
+        if not mode or not self.is_staff(request):
+            return self.get_response(request)
+        if mode not in (*self.text_modes, self.file_mode):
+            return HttpResponse(f"Неизвестный режим профилирования: {mode}", status=400)
+
+        profiler = cProfile.Profile()
+        start = time.perf_counter()
+        profiler.enable()
+        try:
+            response = self.get_response(request)
+        finally:
+            profiler.disable()
+        total = time.perf_counter() - start
+
+        if mode == self.file_mode:
+            response["X-Profile-File"] = str(self.save_profile(request, profiler))
+            return response
+        return self.text_response(request, response, profiler, total)
+
+    def is_staff(self, request):
+        user = getattr(request, "user", None)
+        if user is None or not user.is_authenticated:
+            try:
+                authenticated = CachedJWTAuthentication().authenticate(request)
+            except AuthenticationFailed:
+                return False
+            user = authenticated[0] if authenticated else None
+        return bool(user and user.is_staff)
+
+    def save_profile(self, request, profiler):
+        directory = Path(settings.PROFILING_DIR)
+        directory.mkdir(parents=True, exist_ok=True)
+        name = request.path.strip("/").replace("/", "_") or "root"
+        timestamp = timezone.now().strftime("%Y%m%d-%H%M%S-%f")
+        path = directory / f"{timestamp}-{request.method}-{name}.prof"
+        profiler.dump_stats(path)
+        logger.info("Saved profile of %s %s to %s", request.method, request.path, path)
+        return path
+
+    def text_response(self, request, response, profiler, total):
+        stream = io.StringIO()
+        stream.write(
+            f"{request.method} {request.get_full_path()} -> {response.status_code}, "
+            f"{total * 1000:.1f} ms\n\n"
+        )
+        stats = pstats.Stats(profiler, stream=stream)
+        stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(
+            settings.PROFILING_TOP_FUNCTIONS
+        )
+        profile_response = HttpResponse(
+            stream.getvalue(), content_type="text/plain; charset=utf-8"
+        )
+        profile_response["X-Profiled-Status"] = response.status_code
+        return profile_response
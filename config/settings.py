@@ -14,6 +14,7 @@ import os
 from datetime import timedelta
 from pathlib import Path
 
+from django.core.exceptions import ImproperlyConfigured
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -22,7 +23,7 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 
 SECRET_KEY = os.getenv("SECRET_KEY")
 
-DEBUG = True
+DEBUG = os.getenv("DEBUG", "True") == "True"
 
 ALLOWED_HOSTS = []
 
@@ -47,6 +48,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "config.middleware.QueryTimingMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -54,6 +56,7 @@ MIDDLEWARE = [
     "django.contrib.auth.middleware.AuthenticationMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
+    "config.middleware.ProfilingMiddleware",
 ]
 
 ROOT_URLCONF = "config.urls"
@@ -82,7 +85,7 @@ WSGI_APPLICATION = "config.wsgi.application"
 REST_FRAMEWORK = {
     "DEFAULT_FILTER_BACKENDS": ["django_filters.rest_framework.DjangoFilterBackend"],
     "DEFAULT_AUTHENTICATION_CLASSES": (
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
+        "users.authentication.CachedJWTAuthentication",
     ),
     "DEFAULT_PERMISSION_CLASSES": ("rest_framework.permissions.IsAuthenticated",),
     "DEFAULT_SCHEMA_CLASS": "drf_spectacular.openapi.AutoSchema",
@@ -91,6 +94,7 @@ REST_FRAMEWORK = {
 SIMPLE_JWT = {
     "ACCESS_TOKEN_LIFETIME": timedelta(minutes=30),
     "REFRESH_TOKEN_LIFETIME": timedelta(days=1),
+    "TOKEN_OBTAIN_SERIALIZER": "users.serializers.RoleTokenObtainPairSerializer",
 }
 
 SPECTACULAR_SETTINGS = {
@@ -111,6 +115,32 @@ DATABASES = {
     }
 }
 
+# Кэш ролей, аутентификации и представлений сбрасывается сигналами и задачами
+# Celery, поэтому он должен быть общим для всех процессов. Локальный кэш процесса
+# допускается только при DEBUG
+if not DEBUG and not os.getenv("CACHE_LOCATION"):
+    raise ImproperlyConfigured("CACHE_LOCATION обязателен при DEBUG=False")
+
+CACHES = {
+    "default": (
+        {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": os.getenv("CACHE_LOCATION"),
+        }
+        if os.getenv("CACHE_LOCATION")
+        else {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}
+    )
+}
+
+USER_ROLES_CACHE_TIMEOUT = 60 * 10
+
+# Время жизни пользователя, закэшированного при JWT-аутентификации
+USER_AUTH_CACHE_TIMEOUT = 60
+
+# Кэш сериализованных курсов: время жизни в общем кэше и размер LRU-кэша процесса
+COURSE_CACHE_TIMEOUT = 60 * 60
+COURSE_CACHE_LOCAL_SIZE = 1000
+
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
 
@@ -160,7 +190,18 @@ AUTH_USER_MODEL = "users.User"
 
 STRIPE_API_KEY = os.getenv("STRIPE_API_KEY")
 CUR_API_KEY = os.getenv("CURRENCY_API_KEY")
-# CUR_API_URL = "https://api.currencyapi.com/"
+CUR_API_URL = "https://api.currencyapi.com/v3/latest"
+CUR_API_TIMEOUT = 5
+EXCHANGE_RATE_TTL = timedelta(hours=1)
+# Курс старше этого возраста не используется для платежей: обновление по
+# расписанию остановилось, и платёж завершается ошибкой "курс недоступен"
+EXCHANGE_RATE_MAX_AGE = timedelta(days=2)
+# Максимальное время ожидания (в секундах) при long-polling статуса платежа.
+# Ожидание занимает синхронный воркер WSGI, поэтому значение должно быть
+# небольшим и заметно меньше таймаута воркера (gunicorn --timeout)
+PAYMENT_STATUS_MAX_WAIT = 5
+# Количество последних платежей в профиле пользователя
+USER_RECENT_PAYMENTS_LIMIT = 5
 
 # LOGIN_REDIRECT_URL = "/"
 # LOGOUT_REDIRECT_URL = "/"
@@ -177,6 +218,49 @@ DEFAULT_FROM_EMAIL = EMAIL_HOST_USER
 SERVER_EMAIL = EMAIL_HOST_USER
 EMAIL_ADMIN = EMAIL_HOST_USER
 
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "handlers": {
+        "console": {"class": "logging.StreamHandler"},
+    },
+    "loggers": {
+        "config": {"handlers": ["console"], "level": "INFO"},
+        "lms": {"handlers": ["console"], "level": "INFO"},
+        "users": {"handlers": ["console"], "level": "INFO"},
+    },
+}
+
+# Запросы дольше этого порога (в миллисекундах) логируются с самыми
+# повторяющимися SQL-запросами
+SLOW_REQUEST_THRESHOLD_MS = int(os.getenv("SLOW_REQUEST_THRESHOLD_MS", 500))
+# Каталог для профилей запросов (?profile=file) и число функций в текстовом отчёте
+PROFILING_DIR = os.getenv("PROFILING_DIR", BASE_DIR / "profiles")
+PROFILING_TOP_FUNCTIONS = 50
+# Доступ к эндпоинту метрик /metrics/: заголовок Authorization: Bearer
+# <METRICS_TOKEN>, сессия сотрудника или адрес из METRICS_ALLOWED_IPS. Проверка
+# адреса имеет смысл только без прокси: за nginx все запросы приходят с 127.0.0.1
+METRICS_TOKEN = os.getenv("METRICS_TOKEN")
+METRICS_ALLOWED_IPS = [
+    ip for ip in os.getenv("METRICS_ALLOWED_IPS", "").split(",") if ip.strip()
+]
+# Таймаут обращений к Redis при записи метрик (в секундах) и пауза после ошибки
+# Redis, в течение которой метрики не записываются, чтобы не замедлять запросы
+METRICS_REDIS_TIMEOUT = 0.1
+METRICS_REDIS_RETRY_INTERVAL = 30
+
+# Количество писем в одной задаче рассылки об обновлении курса
+COURSE_UPDATE_EMAIL_CHUNK_SIZE = 100
+# Окно (в секундах), в котором обновления курса объединяются в одну рассылку.
+# 0 отключает объединение.
+COURSE_UPDATE_DEBOUNCE = 5 * 60
+# Если запланированная рассылка не выполнилась за окно и этот запас (в секундах),
+# например задача потеряна при перезапуске воркера, она ставится в очередь заново
+COURSE_UPDATE_DEBOUNCE_GRACE = 10 * 60
+
+# Максимальное количество пользователей, деактивируемых одним UPDATE
+INACTIVE_USERS_BATCH_SIZE = 1000
+
 CELERY_TIMEZONE = TIME_ZONE
 CELERY_TASK_TRACK_STARTED = True
 CELERY_TASK_TIME_LIMIT = 30 * 60
@@ -190,5 +274,9 @@ CELERY_BEAT_SCHEDULE = {
     "deactivate-inactive-users-every-minute": {
         "task": "users.tasks.deactivate_inactive_users",
         "schedule": timedelta(minutes=1)
-    }
+    },
+    "refresh-exchange-rate-every-30-minutes": {
+        "task": "users.tasks.refresh_exchange_rate",
+        "schedule": timedelta(minutes=30),
+    },
 }
\ No newline at end of file
@@ -23,6 +23,8 @@ from drf_spectacular.views import (
     SpectacularSwaggerView,
 )
 
+from config.metrics import metrics_view
+
 urlpatterns = [
     path("admin/", admin.site.urls),
     path("learning/", include("lms.urls", namespace="learning")),
@@ -31,5 +33,6 @@ urlpatterns = [
     path(
         "swagger/", SpectacularSwaggerView.as_view(url_name="schema"), name="swagger-ui"
     ),
+    path("metrics/", metrics_view, name="metrics"),
     path("redoc/", SpectacularRedocView.as_view(url_name="schema"), name="redoc"),
 ]
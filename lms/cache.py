@@ -0,0 +1,124 @@
+import threading
+import uuid
+from collections import OrderedDict
+from functools import partial
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from config.metrics import COURSE_CACHE_REQUESTS
+
+
+class LocalLRUCache:
+    """
+    Потокобезопасный LRU-кэш в памяти процесса.
+    """
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self.data = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            value = self.data.get(key)
+            if value is not None:
+                self.data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self.lock:
+            self.data[key] = value
+            self.data.move_to_end(key)
+            while len(self.data) > self.maxsize:
+                self.data.popitem(last=False)
+
+
+local_cache = LocalLRUCache(settings.COURSE_CACHE_LOCAL_SIZE)
+
+
+def course_tag(course_id):
+    return f"course:{course_id}"
+
+
+def subscription_tag(user_id, course_id):
+    return f"subscription:{user_id}:{course_id}"
+
+
+def _tag_version_key(tag):
+    return f"cache_tag:{tag}"
+
+
+def get_tag_versions(tags):
+    """
+    Возвращает текущие версии тегов из общего кэша, создавая недостающие.
+    """
+    keys = [_tag_version_key(tag) for tag in tags]
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            cache.add(key, uuid.uuid4().hex, timeout=None)
+            versions[key] = cache.get(key)
+    return [versions[key] for key in keys]
+
+
+def invalidate_tags(tags):
+    """
+    Сбрасывает все записи, помеченные указанными тегами.
+
+    Версия тега удаляется из общего кэша, поэтому записи со старой версией
+    перестают находиться как в общем кэше, так и в LRU-кэшах всех процессов.
+    Внутри транзакции версия удаляется ещё раз после её фиксации: иначе
+    параллельный запрос мог бы закэшировать ещё не зафиксированное состояние
+    под новой версией.
+    """
+    keys = [_tag_version_key(tag) for tag in tags]
+    cache.delete_many(keys)
+    if transaction.get_connection().in_atomic_block:
+        transaction.on_commit(partial(cache.delete_many, keys))
+
+
+class CourseRepresentationCache:
+    """
+    Кэш сериализованного представления курса.
+
+    Общая для всех пользователей часть (курс с уроками) хранится в Redis
+    и в LRU-кэше процесса перед ним. Персональная часть (признак подписки)
+    хранится отдельно в общем кэше. Ключи включают версии тегов, которые
+    сбрасываются сигналами при изменении курсов, уроков и подписок.
+    Попадания и промахи учитываются в метрике course_cache_requests_total.
+    """
+
+    def __init__(self, course_id, user_id):
+        course_version, subscription_version = get_tag_versions(
+            [course_tag(course_id), subscription_tag(user_id, course_id)]
+        )
+        self.shared_key = f"course_representation:{course_id}:{course_version}"
+        self.user_key = (
+            f"course_subscribed:{course_id}:{user_id}:{subscription_version}"
+        )
+        self.status = None
+
+    def get_is_subscribed(self, build):
+        is_subscribed = cache.get(self.user_key)
+        if is_subscribed is None:
+            is_subscribed = build()
+            cache.set(self.user_key, is_subscribed, settings.COURSE_CACHE_TIMEOUT)
+        return is_subscribed
+
+    def get_shared(self, build):
+        data = local_cache.get(self.shared_key)
+        if data is not None:
+            self.status = "local_hit"
+        else:
+            data = cache.get(self.shared_key)
+            if data is not None:
+                self.status = "shared_hit"
+            else:
+                self.status = "miss"
+                data = build()
+                cache.set(self.shared_key, data, settings.COURSE_CACHE_TIMEOUT)
+            local_cache.set(self.shared_key, data)
+        COURSE_CACHE_REQUESTS.inc(result=self.status)
+        return data
@@ -0,0 +1,307 @@
+import json
+import platform
+import statistics
+import subprocess
+import time
+from collections import Counter
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+
+from django.core.management import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Count
+from django.test.utils import (
+    CaptureQueriesContext,
+    setup_test_environment,
+    teardown_test_environment,
+)
+from django.urls import URLPattern, URLResolver, get_resolver, reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from lms.management.commands.seed_data import SEED_PASSWORD
+from lms.models import Course, Lesson
+from users.models import ExchangeRate, Payment, User
+from users.roles import MODERATOR
+
+# Пространства имён URL, маршруты которых измеряются
+NAMESPACES = ("learning", "users")
+
+
+@dataclass
+class Route:
+    name: str
+    method: str = "get"
+    kwargs: dict = field(default_factory=dict)
+    query: dict = field(default_factory=dict)
+    # Данные запроса; вызываемый объект получает номер итерации
+    data: object = None
+    as_moderator: bool = False
+
+    @property
+    def label(self):
+        label = f"{self.method.upper()} {self.name}"
+        if self.query:
+            label += "?" + "&".join(f"{k}={v}" for k, v in self.query.items())
+        if self.as_moderator:
+            label += " (модератор)"
+        return label
+
+
+def iter_route_names(patterns, namespace=None):
+    for pattern in patterns:
+        if isinstance(pattern, URLResolver):
+            child_namespace = pattern.namespace or namespace
+            yield from iter_route_names(pattern.url_patterns, child_namespace)
+        elif isinstance(pattern, URLPattern) and pattern.name and namespace:
+            yield f"{namespace}:{pattern.name}"
+
+
+@contextmanager
+def test_environment():
+    """
+    Включает тестовое окружение Django: письма не отправляются, разрешён
+    хост testserver. При запуске из тестов окружение уже включено.
+    """
+    try:
+        setup_test_environment()
+    except RuntimeError:
+        yield
+        return
+    try:
+        yield
+    finally:
+        teardown_test_environment()
+
+
+def percentile(quantiles, value):
+    return round(quantiles[value - 1], 2)
+
+
+class Command(BaseCommand):
+    help = (
+        "Нагрузочный прогон всех маршрутов learning/ и users/ на данных "
+        "seed_data: латентность p50/p95/p99 и число SQL-запросов на эндпоинт. "
+        "Изменяющие запросы откатываются. Отчёт сохраняется в JSON."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=50)
+        parser.add_argument("--output", default="bench-report.json")
+        parser.add_argument(
+            "--compare", help="Отчёт предыдущего прогона для сравнения p95"
+        )
+
+    def handle(self, *args, **options):
+        if options["requests"] < 2:
+            raise CommandError("Нужно хотя бы два запроса на эндпоинт")
+        user, moderator = self.get_bench_users()
+        self.clients = {False: APIClient(), True: APIClient()}
+        self.clients[False].force_authenticate(user)
+        self.clients[True].force_authenticate(moderator)
+
+        routes, skipped = self.get_routes(user)
+        route_names = {route.name for route in routes} | set(skipped)
+        for name in iter_route_names(get_resolver().url_patterns):
+            if name.split(":")[0] in NAMESPACES and name not in route_names:
+                skipped[name] = "маршрут не описан в bench_endpoints"
+
+        with test_environment(), transaction.atomic():
+            results = {
+                route.label: self.measure(route, options["requests"])
+                for route in routes
+            }
+            transaction.set_rollback(True)
+
+        report = {
+            "meta": self.get_meta(options["requests"]),
+            "endpoints": results,
+            "skipped": skipped,
+        }
+        with open(options["output"], "w", encoding="utf-8") as file:
+            json.dump(report, file, ensure_ascii=False, indent=2)
+
+        previous = None
+        if options["compare"]:
+            with open(options["compare"], encoding="utf-8") as file:
+                previous = json.load(file)["endpoints"]
+        self.print_report(results, skipped, previous)
+        self.stdout.write(f"Отчёт сохранён в {options['output']}")
+
+    def get_bench_users(self):
+        """
+        Возвращает пользователя без роли модератора, владеющего наибольшим
+        числом курсов, и модератора.
+        """
+        user = (
+            User.objects.filter(is_active=True)
+            .exclude(groups__name=MODERATOR)
+            .annotate(courses_count=Count("courses"))
+            .order_by("-courses_count", "id")
+            .first()
+        )
+        moderator = User.objects.filter(groups__name=MODERATOR).first()
+        if user is None or moderator is None or not user.courses.exists():
+            raise CommandError("Нет данных для прогона, сначала выполните seed_data")
+        return user, moderator
+
+    def get_routes(self, user):
+        """
+        Описывает запросы к маршрутам. Маршруты, которые нельзя безопасно
+        вызывать многократно, возвращаются в skipped с причиной.
+        """
+        course = user.courses.first()
+        lesson = Lesson.objects.filter(owner=user).first()
+        payment = Payment.objects.filter(user=user).first()
+        courses = list(Course.objects.values_list("id", flat=True)[:20])
+        refresh_token = str(RefreshToken.for_user(user))
+
+        routes = [
+            Route("learning:api-root"),
+            Route("learning:courses-list"),
+            Route("learning:courses-list", query={"pagination": "cursor"}),
+            Route("learning:courses-list", query={"fields": "id,title"}),
+            Route("learning:courses-list", as_moderator=True),
+            Route("learning:courses-detail", kwargs={"pk": course.pk}),
+            Route(
+                "learning:courses-detail",
+                "patch",
+                kwargs={"pk": course.pk},
+                data={"title": course.title},
+            ),
+            Route("learning:lesson-list"),
+            Route("learning:lesson-list", as_moderator=True),
+            Route(
+                "learning:lesson-list",
+                "post",
+                data={
+                    "title": "Bench lesson",
+                    "description": "Bench lesson",
+                    "link_to_video": "https://www.youtube.com/watch?v=bench",
+                    "course": course.pk,
+                },
+            ),
+            Route("learning:course-export", as_moderator=True),
+            Route("learning:lesson-export", as_moderator=True),
+            Route("users:users_list"),
+            Route("users:user_detail", kwargs={"pk": user.pk}),
+            Route("users:user_payments", kwargs={"pk": user.pk}),
+            Route(
+                "users:user_edit",
+                "patch",
+                kwargs={"pk": user.pk},
+                data={"first_name": user.first_name},
+            ),
+            Route("users:users_export", as_moderator=True),
+            Route(
+                "users:register",
+                "post",
+                data=lambda i: {
+                    "email": f"bench-{i}@example.com",
+                    "password": SEED_PASSWORD,
+                },
+            ),
+            Route(
+                "users:login",
+                "post",
+                data={"email": user.email, "password": SEED_PASSWORD},
+            ),
+            Route("users:token_refresh", "post", data={"refresh": refresh_token}),
+            Route("users:subscription", "post", data={"course_id": course.pk}),
+            Route(
+                "users:subscription_bulk",
+                "post",
+                data=lambda i: {"courses": courses, "subscribed": i % 2 == 0},
+            ),
+        ]
+        skipped = {
+            "users:payments": "создаёт сессию во внешнем Stripe",
+            "users:user_delete": "удаляет пользователя, повтор невозможен",
+        }
+        optional_routes = (
+            (lesson, "learning:lesson-detail", "у пользователя нет уроков"),
+            (payment, "users:payment_status", "у пользователя нет платежей"),
+        )
+        for obj, name, reason in optional_routes:
+            if obj is not None:
+                routes.append(Route(name, kwargs={"pk": obj.pk}))
+            else:
+                skipped[name] = reason
+        if ExchangeRate.objects.exists():
+            routes.append(Route("users:exchange_rate"))
+        else:
+            skipped["users:exchange_rate"] = "нет сохранённого курса валют"
+        return routes, skipped
+
+    def measure(self, route, requests):
+        client = self.clients[route.as_moderator]
+        path = reverse(route.name, kwargs=route.kwargs)
+        timings, queries, statuses = [], [], Counter()
+        # Первый запрос прогревает кэши и не учитывается
+        for i in range(requests + 1):
+            with CaptureQueriesContext(connection) as captured:
+                start = time.perf_counter()
+                if route.method == "get":
+                    response = client.get(path, route.query)
+                else:
+                    data = route.data(i) if callable(route.data) else route.data
+                    response = getattr(client, route.method)(path, data, format="json")
+                if response.streaming:
+                    b"".join(response.streaming_content)
+                elapsed = (time.perf_counter() - start) * 1000
+            if i:
+                timings.append(elapsed)
+                queries.append(len(captured.captured_queries))
+                statuses[response.status_code] += 1
+
+        quantiles = statistics.quantiles(timings, n=100, method="inclusive")
+        return {
+            "path": path,
+            "requests": requests,
+            "p50_ms": percentile(quantiles, 50),
+            "p95_ms": percentile(quantiles, 95),
+            "p99_ms": percentile(quantiles, 99),
+            "mean_ms": round(statistics.fmean(timings), 2),
+            "queries_mean": round(statistics.fmean(queries), 2),
+            "queries_max": max(queries),
+            "statuses": {str(code): n for code, n in sorted(statuses.items())},
+        }
+
+    def get_meta(self, requests):
+        try:
+            commit = subprocess.run(
+                ["git", "rev-parse", "--short", "HEAD"],
+                capture_output=True,
+                text=True,
+                check=True,
+            ).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            commit = None
+        return {
+            "commit": commit,
+            "created_at": timezone.now().isoformat(),
+            "python": platform.python_version(),
+            "database": connection.vendor,
+            "requests_per_endpoint": requests,
+            "volume": {
+                "users": User.objects.count(),
+                "courses": Course.objects.count(),
+                "lessons": Lesson.objects.count(),
+                "payments": Payment.objects.count(),
+            },
+        }
+
+    def print_report(self, results, skipped, previous=None):
+        for label, result in results.items():
+            line = (
+                f"{label:<55} p50 {result['p50_ms']:>8.2f} мс  "
+                f"p95 {result['p95_ms']:>8.2f} мс  p99 {result['p99_ms']:>8.2f} мс  "
+                f"SQL {result['queries_mean']:>6.1f}  {result['statuses']}"
+            )
+            if previous and label in previous:
+                before = previous[label]["p95_ms"]
+                line += f"  p95 было {before:.2f} мс ({result['p95_ms'] - before:+.2f})"
+            self.stdout.write(line)
+        for name, reason in skipped.items():
+            self.stdout.write(f"Пропущен {name}: {reason}")
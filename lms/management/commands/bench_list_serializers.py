@@ -0,0 +1,61 @@
+import time
+
+from django.core.management import BaseCommand
+from django.db import transaction
+from rest_framework.renderers import JSONRenderer
+
+from lms.models import Course, Lesson
+from lms.serializers import LessonSerializer, LessonValuesSerializer
+
+
+def serialize_with_model_serializer(queryset):
+    return LessonSerializer(queryset, many=True).data
+
+
+def serialize_with_values(queryset):
+    serializer = LessonValuesSerializer()
+    return serializer.to_representation(serializer.get_values_queryset(queryset))
+
+
+class Command(BaseCommand):
+    help = (
+        "Сравнивает скорость сериализации страниц уроков через LessonSerializer "
+        "и через быстрый путь .values()"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--page-size", type=int, default=100)
+        parser.add_argument("--repeat", type=int, default=50)
+
+    def handle(self, *args, **options):
+        page_size, repeat = options["page_size"], options["repeat"]
+        with transaction.atomic():
+            course = Course.objects.create(
+                title="Benchmark course", description="Benchmark course"
+            )
+            Lesson.objects.bulk_create(
+                Lesson(
+                    title=f"Lesson {i}",
+                    description="Benchmark lesson " * 10,
+                    link_to_video="https://www.youtube.com/watch?v=benchmark",
+                    course=course,
+                )
+                for i in range(page_size)
+            )
+            queryset = Lesson.objects.filter(course=course)
+            results = {}
+            for label, serialize in (
+                ("LessonSerializer", serialize_with_model_serializer),
+                ("LessonValuesSerializer", serialize_with_values),
+            ):
+                start = time.perf_counter()
+                for _ in range(repeat):
+                    results[label] = JSONRenderer().render(serialize(queryset.all()))
+                elapsed = time.perf_counter() - start
+                self.stdout.write(
+                    f"{label}: {page_size * repeat / elapsed:.0f} строк/с, "
+                    f"{elapsed / repeat * 1000:.2f} мс на страницу"
+                )
+            identical = len(set(results.values())) == 1
+            self.stdout.write(f"Ответы совпадают: {'да' if identical else 'нет'}")
+            transaction.set_rollback(True)
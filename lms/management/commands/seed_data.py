@@ -0,0 +1,150 @@
+import random
+import time
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import Group
+from django.core.management import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from lms.models import Course, Lesson
+from users.models import ExchangeRate, Payment, Subscription, User
+from users.roles import MODERATOR
+
+SEED_PASSWORD = "seed-password"
+
+
+class Command(BaseCommand):
+    help = (
+        "Создаёт синтетические данные заданного объёма: пользователей, "
+        "модераторов, курсы, уроки, подписки и платежи. Пароль всех созданных "
+        f"пользователей: {SEED_PASSWORD}"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=1000)
+        parser.add_argument("--moderators", type=int, default=10)
+        parser.add_argument("--courses", type=int, default=200)
+        parser.add_argument("--lessons-per-course", type=int, default=20)
+        parser.add_argument("--subscriptions-per-user", type=int, default=5)
+        parser.add_argument("--payments-per-user", type=int, default=3)
+        parser.add_argument("--prefix", default="seed")
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        prefix = options["prefix"]
+        if User.objects.filter(email__startswith=f"{prefix}-").exists():
+            raise CommandError(
+                f"Данные с префиксом {prefix!r} уже созданы, укажите другой --prefix"
+            )
+        if options["users"] < 1:
+            raise CommandError("Нужен хотя бы один пользователь")
+        self.random = random.Random(options["seed"])
+        self.batch_size = options["batch_size"]
+
+        start = time.perf_counter()
+        with transaction.atomic():
+            users = self.create_users(prefix, options["users"], options["moderators"])
+            courses = self.create_courses(prefix, users, options["courses"])
+            lessons = self.create_lessons(courses, options["lessons_per_course"])
+            subscriptions = self.create_subscriptions(
+                users, courses, options["subscriptions_per_user"]
+            )
+            payments = self.create_payments(
+                users, courses, options["payments_per_user"]
+            )
+            ExchangeRate.objects.get_or_create(
+                currency="RUB",
+                defaults={"value": Decimal("100"), "updated_at": timezone.now()},
+            )
+        elapsed = time.perf_counter() - start
+
+        self.stdout.write(
+            f"Создано за {elapsed:.1f} с: пользователей {len(users)} "
+            f"(модераторов {options['moderators']}), курсов {len(courses)}, "
+            f"уроков {len(lessons)}, подписок {subscriptions}, платежей {payments}"
+        )
+
+    def create_users(self, prefix, count, moderators):
+        password = make_password(SEED_PASSWORD)
+        now = timezone.now()
+        users = User.objects.bulk_create(
+            (
+                User(
+                    email=f"{prefix}-{i}@example.com",
+                    first_name=f"User {i}",
+                    password=password,
+                    is_active=True,
+                    last_login=now - timedelta(days=self.random.randint(0, 60)),
+                )
+                for i in range(count)
+            ),
+            batch_size=self.batch_size,
+        )
+        group, _ = Group.objects.get_or_create(name=MODERATOR)
+        group.user_set.add(*users[:moderators])
+        return users
+
+    def create_courses(self, prefix, users, count):
+        return Course.objects.bulk_create(
+            (
+                Course(
+                    title=f"{prefix} course {i}",
+                    description=f"Описание курса {i}. " * 5,
+                    owner=self.random.choice(users),
+                )
+                for i in range(count)
+            ),
+            batch_size=self.batch_size,
+        )
+
+    def create_lessons(self, courses, per_course):
+        return Lesson.objects.bulk_create(
+            (
+                Lesson(
+                    title=f"Lesson {i}",
+                    description=f"Описание урока {i}. " * 10,
+                    link_to_video=f"https://www.youtube.com/watch?v={course.pk}-{i}",
+                    course=course,
+                    owner_id=course.owner_id,
+                )
+                for course in courses
+                for i in range(per_course)
+            ),
+            batch_size=self.batch_size,
+        )
+
+    def create_subscriptions(self, users, courses, per_user):
+        per_user = min(per_user, len(courses))
+        subscriptions = Subscription.objects.bulk_create(
+            (
+                Subscription(user=user, course=course)
+                for user in users
+                for course in self.random.sample(courses, per_user)
+            ),
+            batch_size=self.batch_size,
+        )
+        return len(subscriptions)
+
+    def create_payments(self, users, courses, per_user):
+        if not courses:
+            return 0
+        payments = Payment.objects.bulk_create(
+            (
+                Payment(
+                    user=user,
+                    course=self.random.choice(courses),
+                    amount=self.random.randint(1000, 100000),
+                    status=Payment.STATUS_READY,
+                    session_id=f"cs_seed_{user.pk}_{i}",
+                    link=f"https://checkout.stripe.com/pay/cs_seed_{user.pk}_{i}",
+                )
+                for user in users
+                for i in range(per_user)
+            ),
+            batch_size=self.batch_size,
+        )
+        return len(payments)
@@ -0,0 +1,27 @@
+# Generated by Django 5.1.3 on 2026-10-16 21:00
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("lms", "0004_course_updated_at_lesson_updated_at"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="course",
+            index=models.Index(
+                fields=["updated_at", "id"], name="course_updated_at_id_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="lesson",
+            index=models.Index(
+                fields=["updated_at", "id"], name="lesson_updated_at_id_idx"
+            ),
+        ),
+    ]
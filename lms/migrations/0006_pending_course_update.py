@@ -0,0 +1,53 @@
+# Generated by Django 5.1.3 on 2026-10-16 21:01
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("lms", "0005_course_lesson_updated_at_id_idx"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="PendingCourseUpdate",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "changed_fields",
+                    models.JSONField(default=list, verbose_name="Изменённые поля"),
+                ),
+                (
+                    "scheduled_at",
+                    models.DateTimeField(
+                        default=django.utils.timezone.now,
+                        verbose_name="Дата постановки рассылки в очередь",
+                    ),
+                ),
+                (
+                    "course",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="pending_update",
+                        to="lms.course",
+                        verbose_name="Курс",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Запланированная рассылка об обновлении курса",
+                "verbose_name_plural": "Запланированные рассылки об обновлении курсов",
+            },
+        ),
+    ]
@@ -0,0 +1,176 @@
+import hashlib
+
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from django.utils.cache import get_conditional_response
+from django.utils.dateparse import parse_datetime
+from django.utils.functional import cached_property
+from django.utils.http import http_date
+from rest_framework.exceptions import ValidationError
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+
+from lms.renderers import NDJSONRenderer
+
+
+def parse_fieldset(request):
+    """
+    Разбирает параметры ?fields= и ?expand= запроса.
+
+    ?fields=id,title,lessons.title ограничивает набор полей, вложенные поля
+    указываются через точку. ?expand=lessons добавляет вложенный объект целиком.
+    Возвращает None, если набор полей не ограничен, иначе словарь
+    {поле: множество вложенных полей или None для всех вложенных полей}.
+    """
+    fields = request.query_params.get("fields")
+    if not fields:
+        return None
+    fieldset = {}
+    for name in filter(None, (name.strip() for name in fields.split(","))):
+        field, _, nested = name.partition(".")
+        if nested and fieldset.get(field, set()) is not None:
+            fieldset.setdefault(field, set()).add(nested)
+        else:
+            fieldset[field] = None
+    for field in request.query_params.get("expand", "").split(","):
+        if field.strip():
+            fieldset[field.strip()] = None
+    return fieldset
+
+
+class ConditionalGetMixin:
+    """
+    Миксин для условных GET-запросов.
+
+    Добавляет к ответу заголовки ETag и Last-Modified и отвечает 304 на
+    If-None-Match / If-Modified-Since, не сериализуя тело ответа. Состояние
+    ресурса передаётся в conditional_response из дешёвого запроса к базе.
+    """
+
+    def conditional_response(self, request, etag_parts, last_modified, get_response):
+        """
+        Возвращает 304, если состояние ресурса не изменилось, иначе ответ
+        get_response() с заголовками ETag и Last-Modified.
+
+        Args:
+            etag_parts: Значения, из которых вычисляется ETag.
+            last_modified: Время последнего изменения ресурса или None, если
+                состояние ресурса не сводится к одной дате изменения.
+            get_response: Функция, формирующая полный ответ.
+        """
+        etag_source = repr((request.user.pk, request.get_full_path(), *etag_parts))
+        etag = f'W/"{hashlib.md5(etag_source.encode()).hexdigest()}"'
+        timestamp = int(last_modified.timestamp()) if last_modified else None
+
+        response = get_conditional_response(request, etag=etag, last_modified=timestamp)
+        if response is None:
+            response = get_response()
+        if response.status_code in (200, 304):
+            response.headers["ETag"] = etag
+            if timestamp is not None:
+                response.headers["Last-Modified"] = http_date(timestamp)
+        return response
+
+
+class SparseFieldsetMixin:
+    """
+    Миксин для выборочных полей в GET-запросах (?fields= и ?expand=).
+
+    Передаёт разобранный набор полей в сериализатор и позволяет ограничить
+    загружаемые из базы колонки через only().
+    """
+
+    @cached_property
+    def fieldset(self):
+        if self.request.method != "GET":
+            return None
+        return parse_fieldset(self.request)
+
+    def is_field_requested(self, name):
+        return self.fieldset is None or name in self.fieldset
+
+    def get_serializer(self, *args, **kwargs):
+        if self.fieldset is not None:
+            kwargs.setdefault("fieldset", self.fieldset)
+        return super().get_serializer(*args, **kwargs)
+
+    def only_requested_fields(self, queryset, fieldset, required=("id", "owner")):
+        """
+        Ограничивает загружаемые колонки запрошенными полями модели.
+        """
+        if fieldset is None:
+            return queryset
+        model_fields = {field.name for field in queryset.model._meta.concrete_fields}
+        return queryset.only(
+            *required, *(name for name in fieldset if name in model_fields)
+        )
+
+
+class ValuesListMixin:
+    """
+    Миксин для быстрых GET-списков.
+
+    Список строится сериализатором values_serializer_class из словарей
+    .values() вместо экземпляров моделей и ModelSerializer; создание,
+    изменение и чтение отдельных объектов работают как прежде.
+    """
+
+    values_serializer_class = None
+
+    def list(self, request, *args, **kwargs):
+        if self.values_serializer_class is None:
+            return super().list(request, *args, **kwargs)
+        serializer = self.values_serializer_class(
+            fieldset=getattr(self, "fieldset", None)
+        )
+        queryset = serializer.get_values_queryset(
+            self.filter_queryset(self.get_queryset())
+        )
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(serializer.to_representation(page))
+        return Response(serializer.to_representation(queryset))
+
+
+class NDJSONExportMixin:
+    """
+    Миксин для потоковой выгрузки таблицы в формате NDJSON.
+
+    Строки читаются серверным курсором (.iterator()) и сразу отдаются
+    клиенту через StreamingHttpResponse, поэтому расход памяти не зависит
+    от размера таблицы. Параметр ?updated_since=<ISO 8601> оставляет записи,
+    изменённые не раньше указанного момента, для инкрементальной выгрузки.
+    Фильтр и сортировка по (updated_at, id) выполняются по индексу на этих
+    колонках, который должен быть у экспортируемой модели.
+    """
+
+    export_fields = ()
+    export_chunk_size = 2000
+    renderer_classes = (JSONRenderer, NDJSONRenderer)
+
+    def get_updated_since(self):
+        value = self.request.query_params.get("updated_since")
+        if not value:
+            return None
+        updated_since = parse_datetime(value)
+        if updated_since is None:
+            raise ValidationError(
+                {"updated_since": "Укажите дату и время в формате ISO 8601."}
+            )
+        if timezone.is_naive(updated_since):
+            updated_since = timezone.make_aware(updated_since)
+        return updated_since
+
+    def get_export_queryset(self):
+        queryset = self.get_queryset()
+        updated_since = self.get_updated_since()
+        if updated_since is not None:
+            queryset = queryset.filter(updated_at__gte=updated_since)
+        return queryset.order_by("updated_at", "id").values(*self.export_fields)
+
+    def get(self, request, *args, **kwargs):
+        rows = self.get_export_queryset().iterator(chunk_size=self.export_chunk_size)
+        return StreamingHttpResponse(
+            map(NDJSONRenderer.render_line, rows),
+            content_type=NDJSONRenderer.media_type,
+        )
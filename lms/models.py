@@ -1,4 +1,5 @@
 from django.db import models
+from django.utils import timezone
 
 NULLABLE = {"blank": True, "null": True}
 
@@ -20,6 +21,7 @@ class Course(models.Model):
     owner = models.ForeignKey(
         "users.User", on_delete=models.CASCADE, **NULLABLE, related_name="courses"
     )
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="Дата изменения")
 
     def __str__(self):
         return self.title
@@ -28,6 +30,9 @@ class Course(models.Model):
         verbose_name = "Курс"
         verbose_name_plural = "Курсы"
         ordering = ("id",)
+        indexes = [
+            models.Index(fields=("updated_at", "id"), name="course_updated_at_id_idx"),
+        ]
 
 
 class Lesson(models.Model):
@@ -56,6 +61,7 @@ class Lesson(models.Model):
     owner = models.ForeignKey(
         "users.User", on_delete=models.CASCADE, **NULLABLE, related_name="lessons"
     )
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="Дата изменения")
 
     def __str__(self):
         return self.title
@@ -64,3 +70,35 @@ class Lesson(models.Model):
         verbose_name = "Урок"
         verbose_name_plural = "Уроки"
         ordering = ("id",)
+        indexes = [
+            models.Index(fields=("updated_at", "id"), name="lesson_updated_at_id_idx"),
+        ]
+
+
+class PendingCourseUpdate(models.Model):
+    """
+    Запланированная рассылка об обновлении курса.
+
+    Строка существует, пока задача рассылки не начала выполняться, и служит
+    отметкой о запланированной рассылке; в ней накапливаются изменённые поля.
+    scheduled_at — время постановки задачи в очередь: если задача так и не
+    выполнилась, строка считается устаревшей и задача ставится заново.
+    """
+
+    course = models.OneToOneField(
+        "lms.Course",
+        on_delete=models.CASCADE,
+        related_name="pending_update",
+        verbose_name="Курс",
+    )
+    changed_fields = models.JSONField(default=list, verbose_name="Изменённые поля")
+    scheduled_at = models.DateTimeField(
+        default=timezone.now, verbose_name="Дата постановки рассылки в очередь"
+    )
+
+    def __str__(self):
+        return f"{self.course_id}: {', '.join(self.changed_fields)}"
+
+    class Meta:
+        verbose_name = "Запланированная рассылка об обновлении курса"
+        verbose_name_plural = "Запланированные рассылки об обновлении курсов"
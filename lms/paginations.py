@@ -1,7 +1,65 @@
-from rest_framework.pagination import PageNumberPagination
+from rest_framework.pagination import CursorPagination, PageNumberPagination
 
 
 class CustomPagination(PageNumberPagination):
     page_size = 10
     page_size_query_param = "page_size"
     max_page_size = 100
+
+
+class CustomCursorPagination(CursorPagination):
+    page_size = 10
+    page_size_query_param = "page_size"
+    max_page_size = 100
+    ordering = ("id",)
+
+
+class SwitchablePagination(CustomPagination):
+    """
+    Постраничная пагинация с курсорным (keyset) режимом по запросу.
+
+    Курсорный режим включается параметром ?pagination=cursor или передачей
+    курсора из ссылок next/previous. В этом режиме не выполняется COUNT(*)
+    и OFFSET, поэтому дальние страницы обходятся так же дёшево, как первая.
+    """
+
+    mode_query_param = "pagination"
+    cursor_mode = "cursor"
+    cursor_pagination_class = CustomCursorPagination
+
+    cursor_paginator = None
+
+    def use_cursor(self, request):
+        return (
+            request.query_params.get(self.mode_query_param) == self.cursor_mode
+            or self.cursor_pagination_class.cursor_query_param in request.query_params
+        )
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if self.use_cursor(request):
+            self.cursor_paginator = self.cursor_pagination_class()
+            return self.cursor_paginator.paginate_queryset(queryset, request, view)
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.cursor_paginator is not None:
+            return self.cursor_paginator.get_paginated_response(data)
+        return super().get_paginated_response(data)
+
+    def get_schema_operation_parameters(self, view):
+        cursor_paginator = self.cursor_pagination_class()
+        cursor_parameters = cursor_paginator.get_schema_operation_parameters(view)
+        return super().get_schema_operation_parameters(view) + [
+            {
+                "name": self.mode_query_param,
+                "required": False,
+                "in": "query",
+                "description": "Режим пагинации: 'cursor' для курсорной пагинации.",
+                "schema": {"type": "string", "enum": [self.cursor_mode]},
+            },
+            *[
+                parameter
+                for parameter in cursor_parameters
+                if parameter["name"] == self.cursor_pagination_class.cursor_query_param
+            ],
+        ]
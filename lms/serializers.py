@@ -7,7 +7,19 @@ from lms.validators import validate_youtube_only
 from users.models import Subscription
 
 
-class LessonSerializer(serializers.ModelSerializer):
+class SparseFieldsetSerializerMixin:
+    """
+    Оставляет в сериализаторе только поля из переданного набора fieldset.
+    """
+
+    def __init__(self, *args, fieldset=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if fieldset is not None:
+            for name in set(self.fields) - set(fieldset):
+                self.fields.pop(name)
+
+
+class LessonSerializer(SparseFieldsetSerializerMixin, serializers.ModelSerializer):
     link_to_video = serializers.URLField(validators=[validate_youtube_only])
 
     class Meta:
@@ -21,7 +33,7 @@ class LessonSerializer(serializers.ModelSerializer):
         )
 
 
-class CourseSerializer(serializers.ModelSerializer):
+class CourseSerializer(SparseFieldsetSerializerMixin, serializers.ModelSerializer):
     lessons_count = serializers.SerializerMethodField()
     lessons = LessonSerializer(many=True, read_only=True)
     is_subscribed = serializers.SerializerMethodField()
@@ -37,11 +49,101 @@ class CourseSerializer(serializers.ModelSerializer):
             "is_subscribed",
         )
 
+    def __init__(self, *args, fieldset=None, **kwargs):
+        super().__init__(*args, fieldset=fieldset, **kwargs)
+        if fieldset and fieldset.get("lessons") and "lessons" in self.fields:
+            self.fields["lessons"] = LessonSerializer(
+                many=True, read_only=True, fieldset=fieldset["lessons"]
+            )
+
     @extend_schema_field(IntegerField)
     def get_lessons_count(self, obj):
+        if hasattr(obj, "lessons_count"):
+            return obj.lessons_count
         return obj.lessons.count()
 
     @extend_schema_field(BooleanField)
     def get_is_subscribed(self, obj):
+        if hasattr(obj, "is_subscribed"):
+            return obj.is_subscribed
         user = self.context["request"].user
         return Subscription.objects.filter(user=user, course=obj).exists()
+
+
+class ValuesListSerializer:
+    """
+    Быстрая сериализация GET-списков только для чтения.
+
+    Строит представление напрямую из словарей .values() без создания
+    экземпляров моделей и полей DRF. Порядок и типы значений совпадают
+    с serializer_class, поэтому ответ идентичен обычному сериализатору.
+    """
+
+    serializer_class = None
+    # Имя поля представления -> имя колонки в .values()
+    sources = {}
+
+    def __init__(self, fieldset=None):
+        self.fieldset = fieldset
+        self.fields = [
+            name
+            for name in self.serializer_class.Meta.fields
+            if fieldset is None or name in fieldset
+        ]
+
+    def get_value_fields(self):
+        return [self.sources.get(name, name) for name in self.fields]
+
+    def get_values_queryset(self, queryset):
+        """
+        Возвращает queryset словарей с колонками для представления.
+        Поле id загружается всегда: по нему работают курсорная пагинация
+        и подгрузка вложенных объектов.
+        """
+        value_fields = self.get_value_fields()
+        if "id" not in value_fields:
+            value_fields.append("id")
+        return queryset.prefetch_related(None).values(*value_fields)
+
+    def to_representation(self, rows):
+        columns = [(name, self.sources.get(name, name)) for name in self.fields]
+        return [{name: row[source] for name, source in columns} for row in rows]
+
+
+class LessonValuesSerializer(ValuesListSerializer):
+    serializer_class = LessonSerializer
+    sources = {"course": "course_id"}
+
+
+class CourseValuesSerializer(ValuesListSerializer):
+    """
+    Быстрая сериализация списка курсов. Уроки страницы загружаются
+    одним дополнительным запросом и группируются по курсу.
+    """
+
+    serializer_class = CourseSerializer
+
+    def get_value_fields(self):
+        return [name for name in super().get_value_fields() if name != "lessons"]
+
+    def get_lessons(self, course_ids):
+        fieldset = self.fieldset and self.fieldset["lessons"]
+        lesson_serializer = LessonValuesSerializer(fieldset=fieldset)
+        rows = list(
+            Lesson.objects.filter(course_id__in=course_ids)
+            .order_by(*Lesson._meta.ordering)
+            .values("course_id", *lesson_serializer.get_value_fields())
+        )
+        lessons = {course_id: [] for course_id in course_ids}
+        for row, lesson in zip(rows, lesson_serializer.to_representation(rows)):
+            lessons[row["course_id"]].append(lesson)
+        return lessons
+
+    def to_representation(self, rows):
+        if "lessons" not in self.fields:
+            return super().to_representation(rows)
+        rows = list(rows)
+        lessons = self.get_lessons([row["id"] for row in rows])
+        return super().to_representation(
+            [{**row, "lessons": lessons[row["id"]]} for row in rows]
+        )
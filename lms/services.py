@@ -0,0 +1,72 @@
+import logging
+from datetime import timedelta
+from functools import partial
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from kombu.exceptions import OperationalError
+
+from lms.models import PendingCourseUpdate
+from lms.tasks import send_email_course_update
+
+logger = logging.getLogger(__name__)
+
+
+def notify_course_update(course_id, changed_fields):
+    """
+    Ставит в очередь рассылку об обновлении курса.
+
+    Обновления одного курса в пределах окна COURSE_UPDATE_DEBOUNCE объединяются
+    в одну рассылку, которая запускается после закрытия окна. Отметкой
+    о запланированной рассылке служит строка PendingCourseUpdate: она создаётся
+    или дополняется изменёнными полями под блокировкой, а задача рассылки
+    удаляет её при запуске. Задача ставится в очередь после фиксации транзакции
+    при создании строки, а также если строка старше окна и
+    COURSE_UPDATE_DEBOUNCE_GRACE, то есть задача была потеряна.
+    """
+    window = settings.COURSE_UPDATE_DEBOUNCE
+    if not window:
+        send_email_course_update.delay(course_id, sorted(changed_fields))
+        return
+    now = timezone.now()
+    stale_before = now - timedelta(
+        seconds=window + settings.COURSE_UPDATE_DEBOUNCE_GRACE
+    )
+    with transaction.atomic():
+        pending_updates = PendingCourseUpdate.objects.select_for_update()
+        pending, schedule = pending_updates.get_or_create(
+            course_id=course_id,
+            defaults={"changed_fields": sorted(changed_fields), "scheduled_at": now},
+        )
+        if not schedule:
+            pending.changed_fields = sorted(
+                set(pending.changed_fields) | set(changed_fields)
+            )
+            update_fields = ["changed_fields"]
+            if pending.scheduled_at < stale_before:
+                logger.warning(
+                    "Course %s update notification was not sent, rescheduling",
+                    course_id,
+                )
+                pending.scheduled_at = now
+                update_fields.append("scheduled_at")
+                schedule = True
+            pending.save(update_fields=update_fields)
+        if schedule:
+            transaction.on_commit(partial(schedule_course_update, course_id, window))
+
+
+def schedule_course_update(course_id, window):
+    """
+    Ставит отложенную задачу рассылки. Если брокер недоступен, строка
+    PendingCourseUpdate удаляется, чтобы следующее обновление курса
+    запланировало рассылку заново.
+    """
+    try:
+        send_email_course_update.apply_async(
+            (course_id,), {"pending": True}, countdown=window
+        )
+    except OperationalError:
+        logger.exception("Failed to schedule course %s update notification", course_id)
+        PendingCourseUpdate.objects.filter(course_id=course_id).delete()
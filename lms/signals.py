@@ -0,0 +1,60 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from lms.cache import course_tag, invalidate_tags, subscription_tag
+from lms.models import Course, Lesson
+from users.models import Subscription
+
+
+def touch_courses(course_ids):
+    """
+    Обновляет дату изменения курсов, чьи уроки изменились, и сбрасывает
+    их кэшированное представление.
+    """
+    course_ids = {course_id for course_id in course_ids if course_id is not None}
+    if course_ids:
+        Course.objects.filter(pk__in=course_ids).update(updated_at=timezone.now())
+        invalidate_tags([course_tag(course_id) for course_id in course_ids])
+
+
+@receiver(post_save, sender=Course)
+@receiver(post_delete, sender=Course)
+def invalidate_course_cache(sender, instance, **kwargs):
+    """
+    Сбрасывает кэшированное представление курса при его изменении или удалении.
+    """
+    invalidate_tags([course_tag(instance.pk)])
+
+
+@receiver(pre_save, sender=Lesson)
+def remember_lesson_course(sender, instance, **kwargs):
+    """
+    Запоминает курс урока до сохранения, чтобы обновить и прежний курс
+    при переносе урока.
+    """
+    instance._previous_course_id = (
+        Lesson.objects.filter(pk=instance.pk)
+        .values_list("course_id", flat=True)
+        .first()
+        if instance.pk
+        else None
+    )
+
+
+@receiver(post_save, sender=Lesson)
+@receiver(post_delete, sender=Lesson)
+def touch_lesson_course(sender, instance, **kwargs):
+    """
+    Обновляет дату изменения курса при изменении или удалении урока.
+    """
+    touch_courses((instance.course_id, getattr(instance, "_previous_course_id", None)))
+
+
+@receiver(post_save, sender=Subscription)
+@receiver(post_delete, sender=Subscription)
+def invalidate_subscription_cache(sender, instance, **kwargs):
+    """
+    Сбрасывает кэшированный признак подписки пользователя на курс.
+    """
+    invalidate_tags([subscription_tag(instance.user_id, instance.course_id)])
@@ -1,13 +1,129 @@
+import logging
+import time
+from itertools import islice
+from smtplib import SMTPException
+
 from celery import shared_task
 from django.conf import settings
-from django.core.mail import send_mail
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+
+from config.metrics import (
+    COURSE_UPDATE_CHUNK_FAILURES,
+    COURSE_UPDATE_EMAIL_RATE,
+    COURSE_UPDATE_EMAILS,
+)
+from lms.models import Course, PendingCourseUpdate
+from users.models import Subscription
+
+logger = logging.getLogger(__name__)
 
 
 @shared_task
-def send_email_course_update(course_id, course_title, user_emails):
-    course = f"Обновление курса: {course_title}"
+def send_email_course_update(course_id, changed_fields=(), pending=False):
+    """
+    Разбивает рассылку об обновлении курса на пачки.
+
+    Список изменённых полей объединяется с полями, накопленными за окно
+    объединения обновлений в PendingCourseUpdate; строка удаляется, и следующее
+    обновление курса запланирует новую рассылку. Адреса подписчиков читаются
+    из базы потоком, пачками по COURSE_UPDATE_EMAIL_CHUNK_SIZE. Каждая пачка
+    отправляется отдельной задачей, поэтому рассылка по большому числу
+    подписчиков не упирается в CELERY_TASK_TIME_LIMIT одной задачи.
+
+    Задача, поставленная для PendingCourseUpdate (pending=True), ничего
+    не отправляет, если строки уже нет: рассылку выполнила повторно
+    поставленная задача.
+    """
+    with transaction.atomic():
+        pending_update = (
+            PendingCourseUpdate.objects.select_for_update()
+            .filter(course_id=course_id)
+            .first()
+        )
+        if pending_update is not None:
+            changed_fields = set(changed_fields) | set(pending_update.changed_fields)
+            pending_update.delete()
+        elif pending:
+            return
+    changed_fields = sorted(changed_fields)
+    course_title = (
+        Course.objects.filter(pk=course_id).values_list("title", flat=True).first()
+    )
+    if course_title is None:
+        return
+
+    chunk_size = settings.COURSE_UPDATE_EMAIL_CHUNK_SIZE
+    user_emails = (
+        Subscription.objects.filter(course_id=course_id)
+        .order_by("pk")
+        .values_list("user__email", flat=True)
+        .iterator(chunk_size=chunk_size)
+    )
+    while chunk := list(islice(user_emails, chunk_size)):
+        send_email_course_update_chunk.delay(
+            course_id, course_title, chunk, changed_fields
+        )
+
+
+@shared_task(bind=True, max_retries=3, default_retry_delay=60)
+def send_email_course_update_chunk(
+    self, course_id, course_title, user_emails, changed_fields=()
+):
+    """
+    Отправляет пачку уведомлений об обновлении курса через одно SMTP-соединение.
+
+    Адреса, на которые отправить письмо не удалось, отправляются повторно
+    следующей попыткой задачи. Если не удалось открыть SMTP-соединение,
+    повторяется вся пачка. Число отправленных и неотправленных писем, скорость
+    отправки и число ошибок в пачке учитываются в метриках.
+    """
+    subject = f"Обновление курса: {course_title}"
     message = f"Курс '{course_title}' был обновлён. Проверьте материалы!"
+    if changed_fields:
+        changed = ", ".join(
+            str(Course._meta.get_field(field).verbose_name).lower()
+            for field in changed_fields
+        )
+        message = f"{message}\nИзменено: {changed}."
     from_email = settings.EMAIL_HOST_USER
-    for email in user_emails:
-        send_mail(course, message, from_email, [email])
-    print("Уведомление об обновлении курса разосланы")
+
+    failed_emails = []
+    start = time.perf_counter()
+    connection = get_connection()
+    try:
+        connection.open()
+    except (SMTPException, OSError) as exc:
+        logger.warning("Course %s update emails: SMTP connection failed", course_id)
+        raise self.retry(exc=exc)
+    with connection:
+        for email in user_emails:
+            try:
+                connection.send_messages(
+                    [EmailMessage(subject, message, from_email, [email])]
+                )
+            except (SMTPException, OSError):
+                failed_emails.append(email)
+    elapsed = time.perf_counter() - start
+
+    sent = len(user_emails) - len(failed_emails)
+    rate = sent / elapsed if elapsed else 0
+    COURSE_UPDATE_EMAILS.inc(sent, outcome="sent")
+    COURSE_UPDATE_EMAILS.inc(len(failed_emails), outcome="failed")
+    COURSE_UPDATE_EMAIL_RATE.observe(rate)
+    COURSE_UPDATE_CHUNK_FAILURES.observe(len(failed_emails))
+    logger.info(
+        "Course %s update emails: sent=%d failed=%d rate=%.1f/s",
+        course_id,
+        sent,
+        len(failed_emails),
+        rate,
+        extra={
+            "course_id": course_id,
+            "emails_sent": sent,
+            "emails_failed": len(failed_emails),
+            "emails_per_second": rate,
+        },
+    )
+    if failed_emails:
+        raise self.retry(args=(course_id, course_title, failed_emails, changed_fields))
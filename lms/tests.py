@@ -1,8 +1,31 @@
+import json
+import tempfile
+import time
+from datetime import timedelta
+from io import StringIO
+from pathlib import Path
+from smtplib import SMTPException
+from unittest.mock import patch
+
 from django.contrib.auth.models import Group
+from django.core import mail
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from django.utils.http import http_date
+from kombu.exceptions import OperationalError
 from rest_framework import status
 from rest_framework.test import APIClient, APITestCase
+from rest_framework_simplejwt.tokens import RefreshToken
 
-from lms.models import Course, Lesson
+from config.metrics import registry
+from lms.cache import CourseRepresentationCache
+from lms.models import Course, Lesson, PendingCourseUpdate
+from lms.tasks import send_email_course_update, send_email_course_update_chunk
+from lms.views import CourseViewSet, LessonListCreateAPIView
 from users.models import Subscription, User
 
 
@@ -249,3 +272,883 @@ class LessonTest(APITestCase):
         self.client.force_authenticate(user=self.moderator_user)
         response = self.client.delete(f"/learning/lessons/{self.lesson.id}/")
         self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+
+class CourseQueryCountTest(APITestCase):
+    def setUp(self):
+        self.owner_user = User.objects.create(
+            email="test@test.com", password="12345678"
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.owner_user)
+
+        for i in range(30):
+            course = Course.objects.create(
+                title=f"Course {i}", description="description", owner=self.owner_user
+            )
+            for j in range(3):
+                Lesson.objects.create(
+                    title=f"Lesson {i}.{j}",
+                    description="description",
+                    link_to_video="http://youtube.com",
+                    course=course,
+                    owner=self.owner_user,
+                )
+            if i % 2:
+                Subscription.objects.create(user=self.owner_user, course=course)
+
+    def count_queries(self, page_size):
+        self.client.get("/learning/courses/")
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get("/learning/courses/", {"page_size": page_size})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data["results"]), page_size)
+        return len(context.captured_queries), response
+
+    def test_query_count_does_not_depend_on_page_size(self):
+        """
+        Проверяет, что число запросов не растёт вместе с размером страницы.
+        """
+        small_count, _ = self.count_queries(2)
+        large_count, _ = self.count_queries(30)
+        self.assertEqual(small_count, large_count)
+
+    def test_annotated_fields(self):
+        """
+        Проверяет значения количества уроков и признака подписки.
+        """
+        _, response = self.count_queries(4)
+        for item in response.data["results"]:
+            self.assertEqual(item["lessons_count"], 3)
+            self.assertEqual(len(item["lessons"]), 3)
+        self.assertEqual(
+            [item["is_subscribed"] for item in response.data["results"]],
+            [False, True, False, True],
+        )
+
+
+class LessonCursorPaginationTest(APITestCase):
+    def setUp(self):
+        self.owner_user = User.objects.create(
+            email="test@test.com", password="12345678"
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.owner_user)
+        self.lessons = [
+            Lesson.objects.create(
+                title=f"Lesson {i}",
+                description="description",
+                link_to_video="http://youtube.com",
+                owner=self.owner_user,
+            )
+            for i in range(25)
+        ]
+
+    def test_cursor_pagination_walks_all_pages(self):
+        """
+        Проверяет, что курсорная пагинация проходит все уроки по порядку.
+        """
+        url = "/learning/lessons/?pagination=cursor"
+        ids = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertNotIn("count", response.data)
+            ids.extend(item["id"] for item in response.data["results"])
+            url = response.data["next"]
+        self.assertEqual(ids, [lesson.id for lesson in self.lessons])
+
+    def test_cursor_pagination_skips_count_query(self):
+        """
+        Проверяет, что курсорный режим не выполняет COUNT-запрос.
+        """
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get("/learning/lessons/", {"pagination": "cursor"})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertFalse(
+            any("COUNT(" in query["sql"] for query in context.captured_queries)
+        )
+
+    def test_page_number_pagination_is_default(self):
+        """
+        Проверяет, что без параметров используется постраничная пагинация.
+        """
+        response = self.client.get("/learning/lessons/", {"page": 3})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["count"], 25)
+        self.assertEqual(len(response.data["results"]), 5)
+
+
+class CourseUpdateEmailTest(TestCase):
+    @override_settings(COURSE_UPDATE_EMAIL_CHUNK_SIZE=2)
+    @patch("lms.tasks.send_email_course_update_chunk.delay")
+    def test_fan_out_streams_subscribers_in_chunks(self, mock_delay):
+        """
+        Проверяет, что подписчики читаются из базы и разбиваются на пачки.
+        """
+        course = Course.objects.create(title="Course", description="description")
+        emails = [f"user{i}@test.com" for i in range(5)]
+        for email in emails:
+            user = User.objects.create(email=email, password="12345678")
+            Subscription.objects.create(user=user, course=course)
+
+        send_email_course_update(course.id)
+        self.assertEqual(
+            [call.args for call in mock_delay.call_args_list],
+            [
+                (course.id, "Course", emails[0:2], []),
+                (course.id, "Course", emails[2:4], []),
+                (course.id, "Course", emails[4:5], []),
+            ],
+        )
+
+    @patch("lms.tasks.get_connection", wraps=mail.get_connection)
+    def test_chunk_reuses_connection(self, mock_get_connection):
+        """
+        Проверяет, что пачка писем отправляется через одно соединение.
+        """
+        emails = [f"user{i}@test.com" for i in range(3)]
+        send_email_course_update_chunk(1, "Course", emails, ["title"])
+        mock_get_connection.assert_called_once()
+        self.assertEqual([message.to for message in mail.outbox], [[e] for e in emails])
+        self.assertIn("Изменено: название.", mail.outbox[0].body)
+
+    @patch("lms.tasks.send_email_course_update_chunk.retry", side_effect=Exception)
+    def test_chunk_retries_failed_emails_only(self, mock_retry):
+        """
+        Проверяет, что повторно отправляются только неудачные письма.
+        """
+        registry.clear()
+        original_send = mail.get_connection().__class__.send_messages
+
+        def send_messages(connection, messages):
+            if messages[0].to == ["bad@test.com"]:
+                raise OSError
+            return original_send(connection, messages)
+
+        with patch(
+            "django.core.mail.backends.locmem.EmailBackend.send_messages",
+            send_messages,
+        ):
+            with self.assertRaises(Exception):
+                send_email_course_update_chunk(
+                    1, "Course", ["a@test.com", "bad@test.com", "b@test.com"]
+                )
+        self.assertEqual(len(mail.outbox), 2)
+        self.assertEqual(mock_retry.call_args.kwargs["args"][2], ["bad@test.com"])
+
+        metrics = registry.render()
+        self.assertIn('course_update_emails_total{outcome="sent"} 2\n', metrics)
+        self.assertIn('course_update_emails_total{outcome="failed"} 1\n', metrics)
+        self.assertIn("course_update_email_chunk_failures_sum{} 1\n", metrics)
+        self.assertIn("course_update_emails_per_second_count{} 1\n", metrics)
+
+    @patch("lms.tasks.send_email_course_update_chunk.retry", side_effect=Exception)
+    def test_chunk_retried_when_connection_fails(self, mock_retry):
+        """
+        Проверяет, что при ошибке открытия SMTP-соединения повторяется вся пачка.
+        """
+        with patch(
+            "django.core.mail.backends.locmem.EmailBackend.open",
+            side_effect=SMTPException,
+        ):
+            with self.assertRaises(Exception):
+                send_email_course_update_chunk(1, "Course", ["a@test.com"])
+        self.assertEqual(mail.outbox, [])
+        mock_retry.assert_called_once()
+        self.assertIsInstance(mock_retry.call_args.kwargs["exc"], SMTPException)
+
+
+class CourseUpdateDebounceTest(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.owner_user = User.objects.create(
+            email="test@test.com", password="12345678"
+        )
+        self.course = Course.objects.create(
+            title="Test Course", description="Course description", owner=self.owner_user
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.owner_user)
+
+    def update_course(self, title, **data):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.patch(
+                f"/learning/courses/{self.course.id}/", {"title": title, **data}
+            )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    @override_settings(COURSE_UPDATE_DEBOUNCE=60)
+    @patch("lms.tasks.send_email_course_update_chunk.delay")
+    @patch("lms.services.send_email_course_update.apply_async")
+    def test_updates_within_window_coalesced(self, mock_apply_async, mock_chunk):
+        """
+        Проверяет, что несколько обновлений в окне дают одну рассылку.
+        """
+        self.update_course("First")
+        self.update_course("Second")
+        self.update_course("Third")
+        mock_apply_async.assert_called_once_with(
+            (self.course.id,), {"pending": True}, countdown=60
+        )
+
+        send_email_course_update(self.course.id)
+        self.update_course("Fourth")
+        self.assertEqual(mock_apply_async.call_count, 2)
+
+    @override_settings(COURSE_UPDATE_DEBOUNCE=60)
+    @patch("lms.tasks.send_email_course_update_chunk.delay")
+    @patch("lms.services.send_email_course_update.apply_async")
+    def test_unchanged_update_not_notified(self, mock_apply_async, mock_chunk):
+        """
+        Проверяет, что обновление без изменений не ставит рассылку, а изменённые
+        поля объединяются в окне.
+        """
+        Subscription.objects.create(user=self.owner_user, course=self.course)
+        self.update_course("Test Course", description="Course description")
+        mock_apply_async.assert_not_called()
+
+        self.update_course("Test Course", description="New description")
+        self.update_course("New title")
+        mock_apply_async.assert_called_once()
+
+        send_email_course_update(self.course.id)
+        self.assertEqual(
+            mock_chunk.call_args.args,
+            (self.course.id, "New title", ["test@test.com"], ["description", "title"]),
+        )
+
+    @override_settings(COURSE_UPDATE_DEBOUNCE=60)
+    @patch("lms.tasks.send_email_course_update_chunk.delay")
+    @patch("lms.services.send_email_course_update.apply_async")
+    def test_pending_fields_stored_in_database(self, mock_apply_async, mock_chunk):
+        """
+        Проверяет, что отметка о рассылке и изменённые поля хранятся в базе
+        и не зависят от кэша процесса.
+        """
+        Subscription.objects.create(user=self.owner_user, course=self.course)
+        self.update_course("New title")
+        cache.clear()
+        self.update_course("New title", description="New description")
+        mock_apply_async.assert_called_once()
+        self.assertEqual(
+            PendingCourseUpdate.objects.get(course=self.course).changed_fields,
+            ["description", "title"],
+        )
+
+        send_email_course_update(self.course.id)
+        self.assertFalse(PendingCourseUpdate.objects.exists())
+        self.assertEqual(mock_chunk.call_args.args[3], ["description", "title"])
+
+    @override_settings(COURSE_UPDATE_DEBOUNCE=60, COURSE_UPDATE_DEBOUNCE_GRACE=60)
+    @patch("lms.tasks.send_email_course_update_chunk.delay")
+    @patch("lms.services.send_email_course_update.apply_async")
+    def test_lost_task_rescheduled(self, mock_apply_async, mock_chunk):
+        """
+        Проверяет, что рассылка, задача которой потеряна, ставится заново,
+        а повторная задача не отправляет письма второй раз.
+        """
+        Subscription.objects.create(user=self.owner_user, course=self.course)
+        self.update_course("First")
+        self.update_course("Second")
+        self.assertEqual(mock_apply_async.call_count, 1)
+
+        PendingCourseUpdate.objects.update(
+            scheduled_at=timezone.now() - timedelta(seconds=121)
+        )
+        self.update_course("Third")
+        self.assertEqual(mock_apply_async.call_count, 2)
+
+        send_email_course_update(self.course.id, pending=True)
+        send_email_course_update(self.course.id, pending=True)
+        mock_chunk.assert_called_once()
+
+    @override_settings(COURSE_UPDATE_DEBOUNCE=60)
+    @patch(
+        "lms.services.send_email_course_update.apply_async",
+        side_effect=OperationalError,
+    )
+    def test_broker_failure_releases_pending_update(self, mock_apply_async):
+        """
+        Проверяет, что при недоступном брокере строка рассылки удаляется
+        и следующее обновление снова ставит задачу.
+        """
+        with self.assertLogs("lms.services", "ERROR"):
+            self.update_course("First")
+        self.assertFalse(PendingCourseUpdate.objects.exists())
+
+        with self.assertLogs("lms.services", "ERROR"):
+            self.update_course("Second")
+        self.assertEqual(mock_apply_async.call_count, 2)
+
+    @override_settings(COURSE_UPDATE_DEBOUNCE=0)
+    @patch("lms.services.send_email_course_update.delay")
+    def test_debounce_disabled(self, mock_delay):
+        """
+        Проверяет, что при нулевом окне каждое обновление ставит рассылку сразу.
+        """
+        self.update_course("First")
+        self.update_course("Second")
+        self.assertEqual(mock_delay.call_count, 2)
+
+
+class ConditionalGetTest(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.owner_user = User.objects.create(
+            email="test@test.com", password="12345678"
+        )
+        self.course = Course.objects.create(
+            title="Test Course", description="Course description", owner=self.owner_user
+        )
+        self.lesson = Lesson.objects.create(
+            title="Test Lesson",
+            description="Lesson description",
+            link_to_video="http://youtube.com",
+            course=self.course,
+            owner=self.owner_user,
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.owner_user)
+        self.course_url = f"/learning/courses/{self.course.id}/"
+
+    def test_course_not_modified(self):
+        """
+        Проверяет, что при совпадении ETag курс не сериализуется повторно.
+        """
+        response = self.client.get(self.course_url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        etag = response["ETag"]
+
+        with self.assertNumQueries(1):
+            response = self.client.get(self.course_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response["ETag"], etag)
+
+    def test_course_etag_changes(self):
+        """
+        Проверяет, что ETag курса меняется при изменении урока и подписки.
+        """
+        etag = self.client.get(self.course_url)["ETag"]
+
+        self.lesson.title = "Updated Lesson"
+        self.lesson.save()
+        response = self.client.get(self.course_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response["ETag"], etag)
+        etag = response["ETag"]
+
+        Subscription.objects.toggle(self.owner_user, self.course.id)
+        response = self.client.get(self.course_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.data["is_subscribed"])
+
+    def test_lesson_move_touches_both_courses(self):
+        """
+        Проверяет, что перенос урока обновляет дату изменения обоих курсов.
+        """
+        other_course = Course.objects.create(
+            title="Other Course", description="Course description"
+        )
+        before = Course.objects.get(pk=self.course.pk).updated_at
+        self.lesson.course = other_course
+        self.lesson.save()
+        self.assertGreater(Course.objects.get(pk=self.course.pk).updated_at, before)
+        self.assertGreater(
+            Course.objects.get(pk=other_course.pk).updated_at, other_course.updated_at
+        )
+
+    def test_course_list_not_modified(self):
+        """
+        Проверяет условный GET для списка курсов.
+        """
+        etag = self.client.get("/learning/courses/")["ETag"]
+        response = self.client.get("/learning/courses/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        Course.objects.create(
+            title="New Course", description="Course description", owner=self.owner_user
+        )
+        response = self.client.get("/learning/courses/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["count"], 2)
+
+    def test_course_if_modified_since_ignores_stale_state(self):
+        """
+        Проверяет, что If-Modified-Since без ETag не возвращает устаревший
+        признак подписки и список после удаления курса.
+        """
+        since = http_date(time.time() + 60)
+        old_course = Course.objects.create(
+            title="Old Course", description="Course description", owner=self.owner_user
+        )
+        response = self.client.get(self.course_url)
+        self.assertNotIn("Last-Modified", response)
+
+        Subscription.objects.toggle(self.owner_user, self.course.id)
+        response = self.client.get(self.course_url, HTTP_IF_MODIFIED_SINCE=since)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.data["is_subscribed"])
+
+        old_course.delete()
+        response = self.client.get("/learning/courses/", HTTP_IF_MODIFIED_SINCE=since)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["count"], 1)
+
+    def test_lesson_not_modified(self):
+        """
+        Проверяет условный GET для урока.
+        """
+        url = f"/learning/lessons/{self.lesson.id}/"
+        etag = self.client.get(url)["ETag"]
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        last_modified = self.client.get(url)["Last-Modified"]
+        response = self.client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+
+class CourseRepresentationCacheTest(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.owner_user = User.objects.create(
+            email="test@test.com", password="12345678"
+        )
+        self.course = Course.objects.create(
+            title="Test Course", description="Course description", owner=self.owner_user
+        )
+        self.lesson = Lesson.objects.create(
+            title="Test Lesson",
+            description="Lesson description",
+            link_to_video="http://youtube.com",
+            course=self.course,
+            owner=self.owner_user,
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.owner_user)
+        self.url = f"/learning/courses/{self.course.id}/"
+
+    def test_cached_representation(self):
+        """
+        Проверяет, что повторный запрос курса берётся из кэша процесса
+        и совпадает с исходным ответом.
+        """
+        registry.clear()
+        response = self.client.get(self.url)
+        self.assertEqual(response["X-Cache"], "miss")
+
+        with self.assertNumQueries(1):
+            cached_response = self.client.get(self.url)
+        self.assertEqual(cached_response["X-Cache"], "local_hit")
+        self.assertEqual(cached_response.content, response.content)
+
+        metrics = registry.render()
+        self.assertIn('course_cache_requests_total{result="miss"} 1\n', metrics)
+        self.assertIn('course_cache_requests_total{result="local_hit"} 1\n', metrics)
+
+    def test_invalidation_repeated_after_commit(self):
+        """
+        Проверяет, что признак подписки, закэшированный параллельным запросом
+        до фиксации транзакции, сбрасывается после неё.
+        """
+        with self.captureOnCommitCallbacks(execute=True):
+            with transaction.atomic():
+                Subscription.objects.create(user=self.owner_user, course=self.course)
+                CourseRepresentationCache(
+                    self.course.pk, self.owner_user.pk
+                ).get_is_subscribed(lambda: False)
+
+        representation = CourseRepresentationCache(self.course.pk, self.owner_user.pk)
+        self.assertTrue(representation.get_is_subscribed(lambda: True))
+
+    def test_lesson_change_invalidates_course(self):
+        """
+        Проверяет, что изменение урока сбрасывает кэш курса.
+        """
+        self.client.get(self.url)
+        self.lesson.title = "Updated Lesson"
+        self.lesson.save()
+
+        response = self.client.get(self.url)
+        self.assertEqual(response["X-Cache"], "miss")
+        self.assertEqual(response.data["lessons"][0]["title"], "Updated Lesson")
+
+    def test_subscription_stored_separately(self):
+        """
+        Проверяет, что смена подписки не сбрасывает общую часть представления.
+        """
+        self.assertFalse(self.client.get(self.url).data["is_subscribed"])
+        Subscription.objects.create(user=self.owner_user, course=self.course)
+
+        response = self.client.get(self.url)
+        self.assertEqual(response["X-Cache"], "local_hit")
+        self.assertTrue(response.data["is_subscribed"])
+
+        Subscription.objects.toggle(self.owner_user, self.course.id)
+        self.assertFalse(self.client.get(self.url).data["is_subscribed"])
+
+
+class SparseFieldsetTest(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.owner_user = User.objects.create(
+            email="test@test.com", password="12345678"
+        )
+        self.course = Course.objects.create(
+            title="Test Course", description="Course description", owner=self.owner_user
+        )
+        self.lesson = Lesson.objects.create(
+            title="Test Lesson",
+            description="Lesson description",
+            link_to_video="http://youtube.com",
+            course=self.course,
+            owner=self.owner_user,
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.owner_user)
+
+    def test_course_list_fields(self):
+        """
+        Проверяет, что ?fields= ограничивает поля курса и уроки не загружаются.
+        """
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get("/learning/courses/?fields=id,title")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            response.data["results"],
+            [{"id": self.course.id, "title": "Test Course"}],
+        )
+        sql = " ".join(query["sql"] for query in queries.captured_queries)
+        self.assertNotIn("lms_lesson", sql)
+        self.assertNotIn('"lms_course"."description"', sql)
+
+    def test_nested_lesson_fields(self):
+        """
+        Проверяет выбор вложенных полей урока через точку.
+        """
+        response = self.client.get(
+            f"/learning/courses/{self.course.id}/?fields=id,lessons.title"
+        )
+        self.assertEqual(
+            response.data,
+            {"id": self.course.id, "lessons": [{"title": "Test Lesson"}]},
+        )
+
+    def test_expand_lessons(self):
+        """
+        Проверяет, что ?expand=lessons добавляет уроки целиком.
+        """
+        response = self.client.get("/learning/courses/?fields=id&expand=lessons")
+        course = response.data["results"][0]
+        self.assertEqual(set(course), {"id", "lessons"})
+        self.assertEqual(course["lessons"][0]["description"], "Lesson description")
+
+    def test_full_representation_by_default(self):
+        """
+        Проверяет, что без ?fields= возвращается полное представление.
+        """
+        response = self.client.get(f"/learning/courses/{self.course.id}/")
+        self.assertIn("lessons_count", response.data)
+        self.assertIn("lessons", response.data)
+
+    def test_lesson_list_fields(self):
+        """
+        Проверяет, что список уроков загружает только запрошенные колонки.
+        """
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get("/learning/lessons/?fields=id,title")
+        self.assertEqual(
+            response.data["results"],
+            [{"id": self.lesson.id, "title": "Test Lesson"}],
+        )
+        sql = " ".join(query["sql"] for query in queries.captured_queries)
+        self.assertNotIn('"lms_lesson"."description"', sql)
+
+
+class ValuesListSerializerTest(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.owner_user = User.objects.create(
+            email="test@test.com", password="12345678"
+        )
+        self.course = Course.objects.create(
+            title="Test Course", description="Курс «с кавычками»", owner=self.owner_user
+        )
+        self.empty_course = Course.objects.create(
+            title="Empty Course", description="", owner=self.owner_user
+        )
+        for i in range(3):
+            Lesson.objects.create(
+                title=f"Lesson {i}",
+                description="Lesson description",
+                link_to_video="http://youtube.com/watch?v=1&t=2",
+                course=self.course,
+                owner=self.owner_user,
+            )
+        Lesson.objects.create(
+            title="Orphan lesson",
+            description="",
+            link_to_video="http://youtube.com",
+            owner=self.owner_user,
+        )
+        Subscription.objects.create(user=self.owner_user, course=self.course)
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.owner_user)
+
+    def assert_same_as_model_serializer(self, view, url):
+        """
+        Сравнивает байты ответа быстрого пути и обычного ModelSerializer.
+        """
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        with patch.object(view, "values_serializer_class", None):
+            expected = self.client.get(url)
+        self.assertEqual(response.content, expected.content)
+
+    def test_course_list_identical(self):
+        """
+        Проверяет совпадение списка курсов с CourseSerializer.
+        """
+        for url in (
+            "/learning/courses/",
+            "/learning/courses/?pagination=cursor&page_size=1",
+            "/learning/courses/?fields=id,lessons_count,is_subscribed",
+            "/learning/courses/?fields=title,lessons.title,lessons.course",
+            "/learning/courses/?fields=id&expand=lessons",
+        ):
+            with self.subTest(url=url):
+                self.assert_same_as_model_serializer(CourseViewSet, url)
+
+    def test_lesson_list_identical(self):
+        """
+        Проверяет совпадение списка уроков с LessonSerializer.
+        """
+        for url in (
+            "/learning/lessons/",
+            "/learning/lessons/?page=2&page_size=3",
+            "/learning/lessons/?pagination=cursor",
+            "/learning/lessons/?fields=course,title",
+        ):
+            with self.subTest(url=url):
+                self.assert_same_as_model_serializer(LessonListCreateAPIView, url)
+
+    def test_course_list_queries(self):
+        """
+        Проверяет, что уроки страницы загружаются одним запросом.
+        """
+        self.client.get("/learning/courses/")
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get("/learning/courses/")
+        lesson_queries = [
+            query
+            for query in queries.captured_queries
+            if query["sql"].startswith('SELECT "lms_lesson"')
+        ]
+        self.assertEqual(len(lesson_queries), 1)
+
+
+class ExportTest(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.owner_user = User.objects.create(
+            email="test@test.com", password="12345678"
+        )
+        self.moderator = User.objects.create(
+            email="moderator@test.com", password="12345678"
+        )
+        self.moderator.groups.add(Group.objects.create(name="moderator"))
+        self.courses = [
+            Course.objects.create(
+                title=f"Course {i}", description="Описание", owner=self.owner_user
+            )
+            for i in range(3)
+        ]
+        Lesson.objects.create(
+            title="Test Lesson",
+            description="Lesson description",
+            link_to_video="http://youtube.com",
+            course=self.courses[0],
+            owner=self.owner_user,
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.moderator)
+
+    def read_ndjson(self, response):
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.streaming)
+        self.assertEqual(response["Content-Type"], "application/x-ndjson")
+        content = b"".join(response.streaming_content).decode()
+        return [json.loads(line) for line in content.splitlines()]
+
+    def test_export_courses(self):
+        """
+        Проверяет потоковую выгрузку всех курсов в NDJSON.
+        """
+        rows = self.read_ndjson(self.client.get("/learning/export/courses/"))
+        self.assertEqual(
+            [row["id"] for row in rows],
+            list(
+                Course.objects.order_by("updated_at", "id").values_list("id", flat=True)
+            ),
+        )
+        self.assertEqual(rows[0]["description"], "Описание")
+
+    def test_export_lessons(self):
+        """
+        Проверяет потоковую выгрузку уроков в NDJSON.
+        """
+        rows = self.read_ndjson(self.client.get("/learning/export/lessons/"))
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(rows[0]["course_id"], self.courses[0].id)
+
+    def test_export_updated_since(self):
+        """
+        Проверяет инкрементальную выгрузку по ?updated_since=.
+        """
+        Course.objects.filter(pk=self.courses[0].pk).update(
+            updated_at=timezone.now() - timedelta(days=2)
+        )
+        since = (timezone.now() - timedelta(days=1)).isoformat()
+        rows = self.read_ndjson(
+            self.client.get("/learning/export/courses/", {"updated_since": since})
+        )
+        self.assertEqual([row["id"] for row in rows], [c.id for c in self.courses[1:]])
+
+        response = self.client.get(
+            "/learning/export/courses/", {"updated_since": "вчера"}
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_export_forbidden_for_users(self):
+        """
+        Проверяет, что обычный пользователь не может выгружать курсы.
+        """
+        self.client.force_authenticate(user=self.owner_user)
+        response = self.client.get("/learning/export/courses/")
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+
+class SeedAndBenchmarkTest(TestCase):
+    def test_seed_and_benchmark_all_routes(self):
+        """
+        Проверяет генерацию данных и прогон бенчмарка по всем маршрутам.
+        """
+        call_command(
+            "seed_data",
+            users=20,
+            moderators=2,
+            courses=5,
+            lessons_per_course=3,
+            stdout=StringIO(),
+        )
+        self.assertEqual(User.objects.filter(email__startswith="seed-").count(), 20)
+        self.assertEqual(Lesson.objects.count(), 15)
+
+        with tempfile.TemporaryDirectory() as directory:
+            output = Path(directory) / "report.json"
+            call_command(
+                "bench_endpoints", requests=2, output=str(output), stdout=StringIO()
+            )
+            report = json.loads(output.read_text(encoding="utf-8"))
+
+        self.assertEqual(
+            set(report["skipped"]), {"users:payments", "users:user_delete"}
+        )
+        for label, result in report["endpoints"].items():
+            with self.subTest(label=label):
+                self.assertLess(max(map(int, result["statuses"])), 400)
+                self.assertLessEqual(result["p50_ms"], result["p99_ms"])
+
+
+class ServerTimingTest(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.owner_user = User.objects.create(
+            email="test@test.com", password="12345678"
+        )
+        self.course = Course.objects.create(
+            title="Test Course", description="Course description", owner=self.owner_user
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.owner_user)
+
+    def test_server_timing_header(self):
+        """
+        Проверяет заголовок Server-Timing с числом SQL-запросов.
+        """
+        self.client.get("/learning/courses/")
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get("/learning/courses/")
+        server_timing = response["Server-Timing"]
+        self.assertIn(f'desc="{len(queries.captured_queries)} queries"', server_timing)
+        for metric in ("db;dur=", "serialize;dur=", "total;dur="):
+            self.assertIn(metric, server_timing)
+
+    @override_settings(SLOW_REQUEST_THRESHOLD_MS=0)
+    def test_slow_request_logged(self):
+        """
+        Проверяет, что медленный запрос логируется с повторяющимися SQL.
+        """
+        with self.assertLogs("config.middleware", level="WARNING") as logs:
+            self.client.get("/learning/courses/")
+        self.assertIn("Slow request GET /learning/courses/", logs.output[0])
+        self.assertIn("Most repeated SQL: ", logs.output[0])
+
+
+class ProfilingTest(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.staff_user = User.objects.create(
+            email="staff@test.com", password="12345678", is_staff=True
+        )
+        self.owner_user = User.objects.create(
+            email="test@test.com", password="12345678"
+        )
+        Course.objects.create(
+            title="Test Course", description="Course description", owner=self.staff_user
+        )
+        self.client = APIClient()
+
+    def authenticate(self, user):
+        token = RefreshToken.for_user(user).access_token
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {token}")
+
+    def test_text_profile_for_staff(self):
+        """
+        Проверяет, что персонал получает текстовый профиль запроса.
+        """
+        self.authenticate(self.staff_user)
+        response = self.client.get("/learning/courses/?profile=1")
+        self.assertEqual(response["Content-Type"], "text/plain; charset=utf-8")
+        self.assertEqual(response["X-Profiled-Status"], "200")
+        content = response.content.decode()
+        self.assertIn("GET /learning/courses/?profile=1 -> 200", content)
+        self.assertIn("serializers.py", content)
+
+    def test_file_profile(self):
+        """
+        Проверяет сохранение профиля на диск по заголовку X-Profile.
+        """
+        self.authenticate(self.staff_user)
+        with tempfile.TemporaryDirectory() as directory:
+            with override_settings(PROFILING_DIR=directory):
+                response = self.client.get("/learning/courses/", HTTP_X_PROFILE="file")
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertIn("results", response.json())
+            path = Path(response["X-Profile-File"])
+            self.assertEqual(path.parent, Path(directory))
+            self.assertTrue(path.exists())
+
+    def test_profile_ignored_for_non_staff(self):
+        """
+        Проверяет, что флаг профилирования игнорируется для остальных.
+        """
+        self.authenticate(self.owner_user)
+        response = self.client.get("/learning/courses/?profile=1")
+        self.assertEqual(response["Content-Type"], "application/json")
+        self.assertNotIn("X-Profiled-Status", response)
+
+        self.client.credentials(HTTP_AUTHORIZATION="Bearer invalid")
+        response = self.client.get("/learning/courses/?profile=1")
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
@@ -3,7 +3,9 @@ from rest_framework.routers import DefaultRouter
 
 from lms.apps import LmsConfig
 from lms.views import (
+    CourseExportAPIView,
     CourseViewSet,
+    LessonExportAPIView,
     LessonListCreateAPIView,
     LessonRetrieveUpdateDestroyAPIView,
 )
@@ -21,4 +23,6 @@ urlpatterns = [
         LessonRetrieveUpdateDestroyAPIView.as_view(),
         name="lesson-detail",
     ),
+    path("export/courses/", CourseExportAPIView.as_view(), name="course-export"),
+    path("export/lessons/", LessonExportAPIView.as_view(), name="lesson-export"),
 ] + router.urls
@@ -1,27 +1,56 @@
+from functools import partial
+
+from django.db.models import Count, Exists, Max, OuterRef, Prefetch
+from django.shortcuts import get_object_or_404
 from rest_framework import viewsets
-from rest_framework.generics import ListCreateAPIView, RetrieveUpdateDestroyAPIView
+from rest_framework.generics import (
+    GenericAPIView,
+    ListCreateAPIView,
+    RetrieveUpdateDestroyAPIView,
+)
+from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
 
-from lms.tasks import send_email_course_update
+from lms.cache import CourseRepresentationCache
+from lms.mixins import (
+    ConditionalGetMixin,
+    NDJSONExportMixin,
+    SparseFieldsetMixin,
+    ValuesListMixin,
+)
 from lms.models import Course, Lesson
-from lms.paginations import CustomPagination
-from lms.serializers import CourseSerializer, LessonSerializer
+from lms.paginations import SwitchablePagination
+from lms.serializers import (
+    CourseSerializer,
+    CourseValuesSerializer,
+    LessonSerializer,
+    LessonValuesSerializer,
+)
+from lms.services import notify_course_update
 from users.models import Subscription
 from users.permissions import IsOwner, IsModerator
+from users.roles import is_moderator
 
 
-class CourseViewSet(viewsets.ModelViewSet):
+class CourseViewSet(
+    SparseFieldsetMixin, ConditionalGetMixin, ValuesListMixin, viewsets.ModelViewSet
+):
     """
     ViewSet для управления курсами.
 
     - Аутентифицированные пользователи видят свои курсы.
     - Модераторы видят все курсы.
     - Разграничение прав доступа: владельцы или модераторы в зависимости от действия.
+    - GET-запросы поддерживают ?fields= и ?expand=lessons.
+    - Список курсов строится из .values() сериализатором CourseValuesSerializer.
     """
 
     serializer_class = CourseSerializer
-    pagination_class = CustomPagination
+    values_serializer_class = CourseValuesSerializer
+    pagination_class = SwitchablePagination
+    notify_fields = ("title", "description")
 
-    def get_queryset(self):
+    def get_visible_queryset(self):
         """
         Возвращает queryset курсов в зависимости от прав пользователя.
         - Анонимные пользователи получают пустой queryset.
@@ -31,24 +60,138 @@ class CourseViewSet(viewsets.ModelViewSet):
         user = self.request.user
         if not user.is_authenticated:
             return Course.objects.none()
-        if user.groups.filter(name="moderator").exists():
+        if is_moderator(user):
             return Course.objects.all()
         return Course.objects.filter(owner=user)
 
+    def get_is_subscribed_annotation(self):
+        return Exists(
+            Subscription.objects.filter(
+                user_id=self.request.user.pk, course=OuterRef("pk")
+            )
+        )
+
+    def get_queryset(self):
+        """
+        Возвращает видимые пользователю курсы.
+
+        Количество уроков и признак подписки вычисляются аннотациями,
+        а уроки подгружаются одним запросом, чтобы число запросов
+        не зависело от размера страницы. Если набор полей ограничен
+        параметром ?fields=, незапрошенные поля не загружаются.
+        """
+        fieldset = self.fieldset
+        queryset = self.only_requested_fields(self.get_visible_queryset(), fieldset)
+        if self.is_field_requested("lessons_count"):
+            queryset = queryset.annotate(lessons_count=Count("lessons"))
+        if self.is_field_requested("is_subscribed"):
+            queryset = queryset.annotate(
+                is_subscribed=self.get_is_subscribed_annotation()
+            )
+        if self.is_field_requested("lessons"):
+            lessons = self.only_requested_fields(
+                Lesson.objects.all(),
+                fieldset and fieldset["lessons"],
+                required=("id", "course"),
+            )
+            queryset = queryset.prefetch_related(Prefetch("lessons", lessons))
+        return queryset.order_by(*Course._meta.ordering)
+
+    def list(self, request, *args, **kwargs):
+        """
+        Возвращает список курсов с заголовком ETag.
+
+        Состояние списка вычисляется агрегатами по курсам и подпискам
+        пользователя; при совпадении возвращается 304 без сериализации.
+        Last-Modified не отдаётся: список меняется и без изменения
+        updated_at (удаление курса, подписка). Агрегаты выполняются при каждом
+        запросе; Max("updated_at") использует индекс (updated_at, id).
+        """
+        courses = self.get_visible_queryset().aggregate(
+            count=Count("id"), last_modified=Max("updated_at")
+        )
+        subscriptions = Subscription.objects.filter(user_id=request.user.pk).aggregate(
+            count=Count("id"), last_id=Max("id")
+        )
+        return self.conditional_response(
+            request,
+            (*courses.values(), *subscriptions.values(), is_moderator(request.user)),
+            None,
+            partial(super().list, request, *args, **kwargs),
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        """
+        Возвращает курс с заголовком ETag. Last-Modified не отдаётся, так как
+        признак подписки меняется без изменения updated_at курса.
+
+        Права и состояние курса проверяются одним запросом без загрузки уроков;
+        при совпадении возвращается 304 без сериализации. Полное представление
+        курса и признак подписки берутся из CourseRepresentationCache.
+        """
+        course = get_object_or_404(
+            self.get_visible_queryset().only("id", "owner_id", "updated_at"),
+            pk=kwargs["pk"],
+        )
+        self.check_object_permissions(request, course)
+
+        representation = CourseRepresentationCache(course.pk, request.user.pk)
+        is_subscribed = representation.get_is_subscribed(
+            lambda: Subscription.objects.filter(
+                user_id=request.user.pk, course_id=course.pk
+            ).exists()
+        )
+        if self.fieldset is not None:
+            get_response = partial(super().retrieve, request, *args, **kwargs)
+        else:
+            get_response = partial(
+                self.get_cached_response, representation, is_subscribed
+            )
+        return self.conditional_response(
+            request,
+            (course.pk, course.updated_at, is_subscribed),
+            None,
+            get_response,
+        )
+
+    def get_cached_response(self, representation, is_subscribed):
+        """
+        Формирует ответ из общей части представления курса и признака подписки.
+        Заголовок X-Cache показывает, откуда взята общая часть.
+        """
+        data = representation.get_shared(self.serialize_shared_representation)
+        return Response(
+            {**data, "is_subscribed": is_subscribed},
+            headers={"X-Cache": representation.status},
+        )
+
+    def serialize_shared_representation(self):
+        data = self.get_serializer(self.get_object()).data
+        data.pop("is_subscribed")
+        return dict(data)
+
     def perform_update(self, serializer):
         """
-        Обновляет курс и отправляет email-уведомления подписчикам.
+        Обновляет курс и ставит в очередь email-уведомления подписчикам,
+        если изменилось хотя бы одно из полей notify_fields.
+
+        Повторные обновления в пределах COURSE_UPDATE_DEBOUNCE объединяются
+        в одну рассылку. Адреса подписчиков задача получает из базы сама.
 
         Args:
             serializer: Сериализатор с данными для обновления.
         """
+        old_values = {
+            field: getattr(serializer.instance, field) for field in self.notify_fields
+        }
         course = serializer.save()
-        subscribers = Subscription.objects.filter(course=course).values_list(
-            "user__email", flat=True
-        )
-        user_emails = list(subscribers)
-
-        send_email_course_update.delay(course.id, course.title, user_emails)
+        changed_fields = [
+            field
+            for field in self.notify_fields
+            if getattr(course, field) != old_values[field]
+        ]
+        if changed_fields:
+            notify_course_update(course.id, changed_fields)
 
     def perform_create(self, serializer):
         """
@@ -74,17 +217,20 @@ class CourseViewSet(viewsets.ModelViewSet):
         return super().get_permissions()
 
 
-class LessonListCreateAPIView(ListCreateAPIView):
+class LessonListCreateAPIView(SparseFieldsetMixin, ValuesListMixin, ListCreateAPIView):
     """
     APIView для создания и получения списка уроков.
 
     - Аутентифицированные пользователи видят свои уроки.
     - Модераторы видят все уроки.
     - Разграничение прав доступа: владельцы или модераторы в зависимости от действия.
+    - GET-запросы поддерживают ?fields=.
+    - Список уроков строится из .values() сериализатором LessonValuesSerializer.
     """
 
     serializer_class = LessonSerializer
-    pagination_class = CustomPagination
+    values_serializer_class = LessonValuesSerializer
+    pagination_class = SwitchablePagination
 
     def get_queryset(self):
         """
@@ -96,9 +242,11 @@ class LessonListCreateAPIView(ListCreateAPIView):
         user = self.request.user
         if not user.is_authenticated:
             return Lesson.objects.none()
-        if user.groups.filter(name="moderator").exists():
-            return Lesson.objects.all()
-        return Lesson.objects.filter(owner=user)
+        if is_moderator(user):
+            queryset = Lesson.objects.all()
+        else:
+            queryset = Lesson.objects.filter(owner=user)
+        return self.only_requested_fields(queryset, self.fieldset)
 
     def get_permissions(self):
         """
@@ -119,13 +267,16 @@ class LessonListCreateAPIView(ListCreateAPIView):
         serializer.save(owner=self.request.user)
 
 
-class LessonRetrieveUpdateDestroyAPIView(RetrieveUpdateDestroyAPIView):
+class LessonRetrieveUpdateDestroyAPIView(
+    SparseFieldsetMixin, ConditionalGetMixin, RetrieveUpdateDestroyAPIView
+):
     """
     APIView для чтения, обновления и удаления конкретного урока.
 
     - Аутентифицированные пользователи видят свои уроки.
     - Модераторы видят все уроки.
     - Разграничение прав доступа: владельцы или модераторы в зависимости от действия.
+    - GET-запросы поддерживают ?fields=.
     """
 
     serializer_class = LessonSerializer
@@ -140,9 +291,11 @@ class LessonRetrieveUpdateDestroyAPIView(RetrieveUpdateDestroyAPIView):
         user = self.request.user
         if not user.is_authenticated:
             return Lesson.objects.none()
-        if user.groups.filter(name="moderator").exists():
-            return Lesson.objects.all()
-        return Lesson.objects.filter(owner=user)
+        if is_moderator(user):
+            queryset = Lesson.objects.all()
+        else:
+            queryset = Lesson.objects.filter(owner=user)
+        return self.only_requested_fields(queryset, self.fieldset)
 
     def get_permissions(self):
         """
@@ -155,3 +308,49 @@ class LessonRetrieveUpdateDestroyAPIView(RetrieveUpdateDestroyAPIView):
         else:
             self.permission_classes = [IsModerator | IsOwner]
         return super().get_permissions()
+
+    def retrieve(self, request, *args, **kwargs):
+        """
+        Возвращает урок с заголовками ETag и Last-Modified; при совпадении
+        возвращается 304 без сериализации.
+        """
+        lesson = get_object_or_404(
+            self.get_queryset().only("id", "owner_id", "updated_at"), pk=kwargs["pk"]
+        )
+        self.check_object_permissions(request, lesson)
+        return self.conditional_response(
+            request,
+            (lesson.pk, lesson.updated_at),
+            lesson.updated_at,
+            partial(super().retrieve, request, *args, **kwargs),
+        )
+
+
+class CourseExportAPIView(NDJSONExportMixin, GenericAPIView):
+    """
+    APIView для потоковой выгрузки всех курсов в NDJSON.
+    Доступно персоналу и модераторам.
+    """
+
+    queryset = Course.objects.all()
+    permission_classes = [IsAdminUser | IsModerator]
+    export_fields = ("id", "title", "description", "owner_id", "updated_at")
+
+
+class LessonExportAPIView(NDJSONExportMixin, GenericAPIView):
+    """
+    APIView для потоковой выгрузки всех уроков в NDJSON.
+    Доступно персоналу и модераторам.
+    """
+
+    queryset = Lesson.objects.all()
+    permission_classes = [IsAdminUser | IsModerator]
+    export_fields = (
+        "id",
+        "title",
+        "description",
+        "link_to_video",
+        "course_id",
+        "owner_id",
+        "updated_at",
+    )
@@ -1,6 +1,6 @@
 from django.contrib import admin
 
-from users.models import User, Subscription
+from users.models import User, Subscription, ExchangeRate, StripeProduct
 
 
 @admin.register(User)
@@ -15,3 +15,22 @@ class SubscriptionAdmin(admin.ModelAdmin):
         "user",
         "course",
     )
+
+
+@admin.register(ExchangeRate)
+class ExchangeRateAdmin(admin.ModelAdmin):
+    list_display = (
+        "currency",
+        "value",
+        "updated_at",
+    )
+
+
+@admin.register(StripeProduct)
+class StripeProductAdmin(admin.ModelAdmin):
+    list_display = (
+        "product_id",
+        "name",
+        "course",
+        "lesson",
+    )
@@ -0,0 +1,83 @@
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+
+from lms.cache import get_tag_versions, invalidate_tags
+
+# Claims, которые добавляются в токены при входе
+ROLES_CLAIM = "roles"
+AUTH_VERSION_CLAIM = "auth_version"
+
+# Поля пользователя, которые хранятся в кэше; остальные поля, в том числе
+# хэш пароля, не кэшируются и загружаются из базы при обращении к ним
+CACHED_USER_FIELDS = ("id", "email", "is_active", "is_staff", "is_superuser")
+
+
+def user_auth_tag(user_id):
+    return f"user_auth:{user_id}"
+
+
+def get_auth_version(user_id):
+    """
+    Возвращает текущую версию данных аутентификации пользователя.
+    Версия меняется при изменении пользователя или его групп.
+    """
+    return get_tag_versions([user_auth_tag(user_id)])[0]
+
+
+def invalidate_user_auth(user_ids):
+    """
+    Сбрасывает закэшированных пользователей и делает недействительными
+    роли, записанные в их токенах.
+    """
+    invalidate_tags([user_auth_tag(user_id) for user_id in user_ids])
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    JWT-аутентификация с кэшированием пользователя.
+
+    Поля CACHED_USER_FIELDS хранятся в общем кэше USER_AUTH_CACHE_TIMEOUT секунд
+    под ключом из id и версии данных аутентификации, поэтому запрос не обращается
+    к таблице пользователей. Если версия в токене совпадает с текущей, роли
+    берутся из токена без обращения к кэшу ролей и базе.
+    """
+
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken("Token contained no recognizable user identification")
+
+        version = get_auth_version(user_id)
+        key = f"auth_user:{user_id}:{version}"
+        cached_fields = cache.get(key)
+        if cached_fields is None:
+            user = super().get_user(validated_token)
+            cached_fields = {name: getattr(user, name) for name in CACHED_USER_FIELDS}
+            cache.set(key, cached_fields, settings.USER_AUTH_CACHE_TIMEOUT)
+        else:
+            user = self.user_from_cache(cached_fields)
+
+        roles = validated_token.get(ROLES_CLAIM)
+        if roles is not None and validated_token.get(AUTH_VERSION_CLAIM) == version:
+            user._roles_cache = frozenset(roles)
+        return user
+
+    def user_from_cache(self, cached_fields):
+        """
+        Восстанавливает пользователя из закэшированных полей. Остальные поля
+        отложены, как при only(), и сохранение не затрагивает их.
+        """
+        fields = [
+            field
+            for field in self.user_model._meta.concrete_fields
+            if field.attname in cached_fields
+        ]
+        return self.user_model.from_db(
+            "default",
+            [field.attname for field in fields],
+            [cached_fields[field.attname] for field in fields],
+        )
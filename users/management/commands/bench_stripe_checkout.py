@@ -0,0 +1,100 @@
+import json
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import stripe
+from django.core.management import BaseCommand
+from django.db import transaction
+
+from lms.models import Course
+from users.services import (
+    create_stripe_price,
+    create_stripe_product,
+    create_stripe_session,
+    get_stripe_price_id,
+)
+
+
+class FakeStripeHandler(BaseHTTPRequestHandler):
+    """
+    Минимальный локальный Stripe API: отвечает на создание продуктов, цен
+    и сессий и считает обращения.
+    """
+
+    calls = Counter()
+    objects = {
+        "/v1/products": ("prod", "product"),
+        "/v1/prices": ("price", "price"),
+        "/v1/checkout/sessions": ("cs", "checkout.session"),
+    }
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        self.calls[self.path] += 1
+        prefix, object_name = self.objects[self.path]
+        object_id = f"{prefix}_{self.calls[self.path]}"
+        body = json.dumps(
+            {"id": object_id, "object": object_name, "url": f"http://pay/{object_id}"}
+        ).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def checkout_without_mapping(course, amount):
+    product = create_stripe_product(course.title)
+    price = create_stripe_price(amount, product.id)
+    return create_stripe_session(price.id)
+
+
+def checkout_with_mapping(course, amount):
+    return create_stripe_session(get_stripe_price_id(course, amount))
+
+
+class Command(BaseCommand):
+    help = (
+        "Сравнивает число обращений к Stripe на одну оплату с сохранёнными "
+        "продуктами и ценами и без них на локальном фейковом Stripe"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--checkouts", type=int, default=50)
+
+    def handle(self, *args, **options):
+        checkouts = options["checkouts"]
+        server = ThreadingHTTPServer(("127.0.0.1", 0), FakeStripeHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        api_base, api_key = stripe.api_base, stripe.api_key
+        stripe.api_base = f"http://127.0.0.1:{server.server_port}"
+        stripe.api_key = "sk_test_benchmark"
+        try:
+            with transaction.atomic():
+                course = Course.objects.create(
+                    title="Benchmark course", description="Benchmark course"
+                )
+                for label, checkout in (
+                    ("без сохранённых цен", checkout_without_mapping),
+                    ("с сохранёнными ценами", checkout_with_mapping),
+                ):
+                    FakeStripeHandler.calls.clear()
+                    start = time.perf_counter()
+                    for i in range(checkouts):
+                        checkout(course, 10 + i % 3)
+                    elapsed = time.perf_counter() - start
+                    calls = sum(FakeStripeHandler.calls.values())
+                    self.stdout.write(
+                        f"{label}: {calls / checkouts:.2f} обращений к Stripe на оплату, "
+                        f"{elapsed / checkouts * 1000:.1f} мс на оплату "
+                        f"({dict(FakeStripeHandler.calls)})"
+                    )
+                transaction.set_rollback(True)
+        finally:
+            stripe.api_base, stripe.api_key = api_base, api_key
+            server.shutdown()
@@ -0,0 +1,255 @@
+import codecs
+import io
+import json
+import time
+from collections import Counter, defaultdict
+
+from django.core.management import BaseCommand, CommandError
+from django.core.serializers.base import DeserializationError
+from django.core.serializers.python import Deserializer
+from django.db import IntegrityError, connection, transaction
+
+# Символы между объектами JSON-массива или NDJSON-файла
+SEPARATORS = frozenset(" \t\r\n[],")
+
+
+def detect_encoding(path):
+    """
+    Определяет кодировку файла по BOM: фикстуры, выгруженные в Windows,
+    бывают в UTF-16.
+    """
+    with open(path, "rb") as file:
+        bom = file.read(2)
+    if bom in (codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE):
+        return "utf-16"
+    return "utf-8-sig"
+
+
+def iter_json_objects(path, chunk_size=1 << 16):
+    """
+    Построчно читает объекты из JSON-массива или NDJSON-файла, не загружая
+    файл в память целиком.
+    """
+    decoder = json.JSONDecoder()
+    with open(path, encoding=detect_encoding(path)) as file:
+        buffer = ""
+        while True:
+            chunk = file.read(chunk_size)
+            buffer += chunk
+            position = 0
+            while True:
+                while position < len(buffer) and buffer[position] in SEPARATORS:
+                    position += 1
+                if position == len(buffer):
+                    break
+                try:
+                    obj, position = decoder.raw_decode(buffer, position)
+                except json.JSONDecodeError:
+                    if not chunk:
+                        raise CommandError(f"Некорректный JSON в файле {path}")
+                    break
+                yield obj
+            buffer = buffer[position:]
+            if not chunk:
+                return
+
+
+def copy_value(value):
+    """
+    Форматирует значение для текстового формата COPY.
+    """
+    if value is None:
+        return "\\N"
+    if isinstance(value, bool):
+        return "t" if value else "f"
+    return (
+        str(value)
+        .replace("\\", "\\\\")
+        .replace("\t", "\\t")
+        .replace("\n", "\\n")
+        .replace("\r", "\\r")
+    )
+
+
+class Command(BaseCommand):
+    help = (
+        "Быстро загружает фикстуры (JSON или NDJSON) пачками через bulk_create, "
+        "а на PostgreSQL через COPY. В отличие от loaddata объекты получают "
+        "новые id, а внешние ключи пересчитываются по соответствию старых и "
+        "новых id. Объект, совпадающий с существующей строкой по уникальному "
+        "полю (например, Group.name или User.email), не загружается и не "
+        "обновляется: ссылки на него переводятся на существующую строку. "
+        "Сигналы не отправляются. Ссылки на объекты из той же пачки "
+        "не поддерживаются."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("files", nargs="+")
+        parser.add_argument("--batch-size", type=int, default=5000)
+        parser.add_argument(
+            "--no-copy",
+            action="store_true",
+            help="Не использовать COPY даже на PostgreSQL",
+        )
+
+    def handle(self, *args, **options):
+        self.batch_size = options["batch_size"]
+        self.use_copy = connection.vendor == "postgresql" and not options["no_copy"]
+        # Модель -> {id из файла: id в базе}
+        self.id_maps = defaultdict(dict)
+        self.rows = Counter()
+        self.skipped = Counter()
+
+        start = time.perf_counter()
+        try:
+            with transaction.atomic():
+                for path in options["files"]:
+                    self.import_file(path)
+        except IntegrityError as e:
+            raise CommandError(f"Загрузка отменена, конфликт данных: {e}")
+        elapsed = time.perf_counter() - start
+
+        for label in self.rows | self.skipped:
+            line = f"{label}: {self.rows[label]} строк"
+            if self.skipped[label]:
+                line += f", уже существуют: {self.skipped[label]}"
+            self.stdout.write(line)
+        total = sum(self.rows.values())
+        method = "COPY" if self.use_copy else "bulk_create"
+        self.stdout.write(
+            f"Загружено {total} строк за {elapsed:.2f} с "
+            f"({total / elapsed:.0f} строк/с, {method})"
+        )
+
+    def import_file(self, path):
+        batch, batch_model = [], None
+        for obj in iter_json_objects(path):
+            if batch and (
+                obj.get("model") != batch_model or len(batch) >= self.batch_size
+            ):
+                self.import_batch(batch)
+                batch = []
+            batch_model = obj.get("model")
+            batch.append(obj)
+        if batch:
+            self.import_batch(batch)
+
+    def import_batch(self, batch):
+        try:
+            deserialized = list(Deserializer(batch, ignorenonexistent=True))
+        except DeserializationError as e:
+            raise CommandError(str(e))
+        model = deserialized[0].object.__class__
+        old_pks = [item.object.pk for item in deserialized]
+        instances = [self.resolve_foreign_keys(item.object) for item in deserialized]
+        existing_pks = self.find_existing(model, instances)
+        new_items = [
+            item for i, item in enumerate(deserialized) if i not in existing_pks
+        ]
+        new_instances = [item.object for item in new_items]
+
+        if new_instances and self.use_copy:
+            self.copy_insert(model, new_instances)
+        elif new_instances:
+            model.objects.bulk_create(new_instances)
+
+        id_map = self.id_maps[model]
+        for i, (old_pk, instance) in enumerate(zip(old_pks, instances)):
+            if old_pk is not None:
+                id_map[old_pk] = existing_pks.get(i, instance.pk)
+        self.import_m2m(model, new_items)
+        self.rows[model._meta.label_lower] += len(new_instances)
+        self.skipped[model._meta.label_lower] += len(existing_pks)
+
+    def find_existing(self, model, instances):
+        """
+        Находит объекты, совпадающие с уже существующими строками по одному
+        из уникальных полей. Возвращает {номер объекта в пачке: id строки}.
+        """
+        existing_pks = {}
+        for field in model._meta.local_concrete_fields:
+            if not field.unique or field.primary_key:
+                continue
+            positions = {
+                getattr(instance, field.attname): i
+                for i, instance in enumerate(instances)
+                if i not in existing_pks
+                and getattr(instance, field.attname) is not None
+            }
+            if not positions:
+                continue
+            rows = model.objects.filter(
+                **{f"{field.attname}__in": positions}
+            ).values_list(field.attname, "pk")
+            for value, pk in rows:
+                existing_pks[positions[value]] = pk
+        return existing_pks
+
+    def resolve_foreign_keys(self, instance):
+        """
+        Заменяет id связанных объектов на id, полученные при загрузке.
+        Ссылки на объекты, которых не было в файлах, остаются без изменений.
+        """
+        for field in instance._meta.concrete_fields:
+            if field.is_relation:
+                value = getattr(instance, field.attname)
+                id_map = self.id_maps.get(field.related_model, {})
+                setattr(instance, field.attname, id_map.get(value, value))
+        instance.pk = None
+        return instance
+
+    def import_m2m(self, model, deserialized):
+        """
+        Создаёт строки промежуточных таблиц many-to-many одним запросом на поле.
+        """
+        rows = defaultdict(list)
+        for item in deserialized:
+            for field_name, related_pks in (item.m2m_data or {}).items():
+                field = model._meta.get_field(field_name)
+                through = field.remote_field.through
+                source = through._meta.get_field(field.m2m_field_name()).attname
+                target = through._meta.get_field(field.m2m_reverse_field_name()).attname
+                id_map = self.id_maps.get(field.related_model, {})
+                rows[through].extend(
+                    through(**{source: item.object.pk, target: id_map.get(pk, pk)})
+                    for pk in related_pks
+                )
+        for through, objects in rows.items():
+            through.objects.bulk_create(objects, ignore_conflicts=True)
+
+    def copy_insert(self, model, instances):
+        """
+        Загружает объекты командой COPY. Id заранее берутся из последовательности
+        первичного ключа, чтобы по ним можно было пересчитать внешние ключи.
+        """
+        opts = model._meta
+        quote_name = connection.ops.quote_name
+        fields = opts.local_concrete_fields
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT nextval(pg_get_serial_sequence(%s, %s)) "
+                "FROM generate_series(1, %s)",
+                [opts.db_table, opts.pk.column, len(instances)],
+            )
+            for instance, (pk,) in zip(instances, cursor.fetchall()):
+                instance.pk = pk
+
+            data = io.StringIO()
+            for instance in instances:
+                values = (
+                    field.get_db_prep_save(field.pre_save(instance, True), connection)
+                    for field in fields
+                )
+                data.write("\t".join(map(copy_value, values)) + "\n")
+            data.seek(0)
+
+            columns = ", ".join(quote_name(field.column) for field in fields)
+            sql = f"COPY {quote_name(opts.db_table)} ({columns}) FROM STDIN"
+            if hasattr(cursor, "copy_expert"):
+                cursor.copy_expert(sql, data)
+            else:
+                with cursor.copy(sql) as copy:
+                    copy.write(data.getvalue())
+        for instance in instances:
+            instance._state.adding = False
+            instance._state.db = connection.alias
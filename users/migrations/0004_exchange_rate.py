@@ -0,0 +1,62 @@
+# Generated by Django 5.1.3 on 2026-10-16 20:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("users", "0003_remove_payment_pay_day_remove_payment_pay_method_and_more"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ExchangeRate",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "currency",
+                    models.CharField(max_length=3, unique=True, verbose_name="Валюта"),
+                ),
+                (
+                    "value",
+                    models.DecimalField(
+                        decimal_places=4,
+                        max_digits=12,
+                        verbose_name="Стоимость одного доллара",
+                    ),
+                ),
+                ("updated_at", models.DateTimeField(verbose_name="Дата обновления")),
+            ],
+            options={
+                "verbose_name": "Курс валюты",
+                "verbose_name_plural": "Курсы валют",
+            },
+        ),
+        migrations.AddField(
+            model_name="payment",
+            name="exchange_rate",
+            field=models.DecimalField(
+                blank=True,
+                decimal_places=4,
+                max_digits=12,
+                null=True,
+                verbose_name="Применённый курс",
+            ),
+        ),
+        migrations.AddField(
+            model_name="payment",
+            name="exchange_rate_updated_at",
+            field=models.DateTimeField(
+                blank=True, null=True, verbose_name="Дата обновления применённого курса"
+            ),
+        ),
+    ]
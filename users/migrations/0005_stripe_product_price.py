@@ -0,0 +1,109 @@
+# Generated by Django 5.1.3 on 2026-10-16 20:29
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("lms", "0003_alter_course_options_alter_lesson_options"),
+        ("users", "0004_exchange_rate"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="StripeProduct",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "product_id",
+                    models.CharField(max_length=255, verbose_name="id продукта Stripe"),
+                ),
+                (
+                    "name",
+                    models.CharField(max_length=255, verbose_name="Название продукта"),
+                ),
+                (
+                    "course",
+                    models.OneToOneField(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="stripe_product",
+                        to="lms.course",
+                    ),
+                ),
+                (
+                    "lesson",
+                    models.OneToOneField(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="stripe_product",
+                        to="lms.lesson",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Продукт Stripe",
+                "verbose_name_plural": "Продукты Stripe",
+            },
+        ),
+        migrations.CreateModel(
+            name="StripePrice",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("amount", models.PositiveIntegerField(verbose_name="Сумма в USD")),
+                (
+                    "price_id",
+                    models.CharField(max_length=255, verbose_name="id цены Stripe"),
+                ),
+                (
+                    "product",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="prices",
+                        to="users.stripeproduct",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Цена Stripe",
+                "verbose_name_plural": "Цены Stripe",
+            },
+        ),
+        migrations.AddConstraint(
+            model_name="stripeproduct",
+            constraint=models.CheckConstraint(
+                condition=models.Q(
+                    models.Q(("course__isnull", False), ("lesson__isnull", True)),
+                    models.Q(("course__isnull", True), ("lesson__isnull", False)),
+                    _connector="OR",
+                ),
+                name="stripe_product_course_xor_lesson",
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="stripeprice",
+            constraint=models.UniqueConstraint(
+                fields=("product", "amount"), name="stripe_price_product_amount"
+            ),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.1.3 on 2026-10-16 20:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("users", "0005_stripe_product_price"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="payment",
+            name="status",
+            field=models.CharField(
+                choices=[
+                    ("pending", "Ожидает ссылку на оплату"),
+                    ("ready", "Ссылка на оплату готова"),
+                    ("failed", "Ошибка создания оплаты"),
+                ],
+                default="pending",
+                max_length=10,
+                verbose_name="Статус",
+            ),
+        ),
+        migrations.RunSQL(
+            "UPDATE users_payment SET status = 'ready' WHERE link IS NOT NULL",
+            migrations.RunSQL.noop,
+        ),
+    ]
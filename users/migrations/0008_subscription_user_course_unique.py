@@ -0,0 +1,30 @@
+# Generated by Django 5.1.3 on 2026-10-16 20:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("lms", "0003_alter_course_options_alter_lesson_options"),
+        ("users", "0007_user_active_last_login_idx"),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            """
+            DELETE FROM users_subscription duplicate
+            USING users_subscription original
+            WHERE duplicate.user_id = original.user_id
+                AND duplicate.course_id = original.course_id
+                AND duplicate.id > original.id
+            """,
+            migrations.RunSQL.noop,
+        ),
+        migrations.AddConstraint(
+            model_name="subscription",
+            constraint=models.UniqueConstraint(
+                fields=("user", "course"), name="subscription_user_course_unique"
+            ),
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.1.3 on 2026-10-16 21:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("auth", "0012_alter_user_first_name_max_length"),
+        ("users", "0009_user_updated_at"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="user",
+            index=models.Index(
+                fields=["updated_at", "id"], name="user_updated_at_id_idx"
+            ),
+        ),
+    ]
@@ -1,5 +1,6 @@
 from django.contrib.auth.models import AbstractUser
-from django.db import models
+from django.db import connection, models
+from django.utils import timezone
 
 NULLABLE = {"blank": True, "null": True}
 
@@ -21,6 +22,7 @@ class User(AbstractUser):
         verbose_name="Аватар",
         help_text="Загрузите аватар",
     )
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="Дата изменения")
 
     USERNAME_FIELD = "email"
     REQUIRED_FIELDS = []
@@ -28,9 +30,25 @@ class User(AbstractUser):
     class Meta:
         verbose_name = "Пользователь"
         verbose_name_plural = "Пользователи"
+        indexes = [
+            models.Index(
+                fields=("last_login",),
+                condition=models.Q(is_active=True),
+                name="user_active_last_login_idx",
+            ),
+            models.Index(fields=("updated_at", "id"), name="user_updated_at_id_idx"),
+        ]
 
 
 class Payment(models.Model):
+    STATUS_PENDING = "pending"
+    STATUS_READY = "ready"
+    STATUS_FAILED = "failed"
+    STATUS_CHOICES = (
+        (STATUS_PENDING, "Ожидает ссылку на оплату"),
+        (STATUS_READY, "Ссылка на оплату готова"),
+        (STATUS_FAILED, "Ошибка создания оплаты"),
+    )
 
     user = models.ForeignKey(
         "users.User", on_delete=models.CASCADE, related_name="payments", **NULLABLE
@@ -45,6 +63,18 @@ class Payment(models.Model):
     amount = models.PositiveIntegerField(verbose_name="Сумма оплаты", default=0)
     session_id = models.CharField(max_length=255, **NULLABLE, verbose_name="id сессии")
     link = models.URLField(max_length=400, **NULLABLE, verbose_name="Ссылка на оплату")
+    exchange_rate = models.DecimalField(
+        max_digits=12, decimal_places=4, **NULLABLE, verbose_name="Применённый курс"
+    )
+    exchange_rate_updated_at = models.DateTimeField(
+        **NULLABLE, verbose_name="Дата обновления применённого курса"
+    )
+    status = models.CharField(
+        max_length=10,
+        choices=STATUS_CHOICES,
+        default=STATUS_PENDING,
+        verbose_name="Статус",
+    )
 
     def __str__(self):
         return self.amount
@@ -54,6 +84,50 @@ class Payment(models.Model):
         verbose_name_plural = "Платежи"
 
 
+class SubscriptionManager(models.Manager):
+    def toggle(self, user, course_id):
+        """
+        Переключает подписку пользователя на курс одним SQL-запросом.
+
+        Удаление существующей подписки и создание новой выполняются одним
+        атомарным выражением (DELETE ... RETURNING и INSERT ... ON CONFLICT).
+        Сигналы моделей при этом не отправляются, поэтому кэш признака
+        подписки сбрасывается явно.
+        Возвращает True, если пользователь подписан, False, если подписка
+        удалена, и None, если курс не найден.
+        """
+        from lms.cache import invalidate_tags, subscription_tag
+        from lms.models import Course
+
+        subscription_table = self.model._meta.db_table
+        course_table = Course._meta.db_table
+        sql = f"""
+            WITH deleted AS (
+                DELETE FROM {subscription_table}
+                WHERE user_id = %(user_id)s AND course_id = %(course_id)s
+                RETURNING id
+            ), inserted AS (
+                INSERT INTO {subscription_table} (user_id, course_id)
+                SELECT %(user_id)s, id FROM {course_table}
+                WHERE id = %(course_id)s AND NOT EXISTS (SELECT 1 FROM deleted)
+                ON CONFLICT (user_id, course_id) DO NOTHING
+                RETURNING id
+            )
+            SELECT
+                EXISTS (SELECT 1 FROM deleted),
+                EXISTS (SELECT 1 FROM {course_table} WHERE id = %(course_id)s)
+        """
+        with connection.cursor() as cursor:
+            cursor.execute(sql, {"user_id": user.pk, "course_id": course_id})
+            deleted, course_exists = cursor.fetchone()
+        invalidate_tags([subscription_tag(user.pk, course_id)])
+        if deleted:
+            return False
+        if course_exists:
+            return True
+        return None
+
+
 class Subscription(models.Model):
     user = models.ForeignKey(
         "users.User", on_delete=models.CASCADE, related_name="subscriptions"
@@ -62,9 +136,86 @@ class Subscription(models.Model):
         "lms.Course", on_delete=models.CASCADE, related_name="subscriptions"
     )
 
+    objects = SubscriptionManager()
+
     def __str__(self):
         return f"{self.user} signed {self.course}"
 
     class Meta:
         verbose_name = "Подписка"
         verbose_name_plural = "Подписки"
+        constraints = [
+            models.UniqueConstraint(
+                fields=("user", "course"), name="subscription_user_course_unique"
+            ),
+        ]
+
+
+class ExchangeRate(models.Model):
+    currency = models.CharField(max_length=3, unique=True, verbose_name="Валюта")
+    value = models.DecimalField(
+        max_digits=12, decimal_places=4, verbose_name="Стоимость одного доллара"
+    )
+    updated_at = models.DateTimeField(verbose_name="Дата обновления")
+
+    @property
+    def age(self):
+        return timezone.now() - self.updated_at
+
+    def __str__(self):
+        return f"{self.currency}: {self.value}"
+
+    class Meta:
+        verbose_name = "Курс валюты"
+        verbose_name_plural = "Курсы валют"
+
+
+class StripeProduct(models.Model):
+    course = models.OneToOneField(
+        "lms.Course",
+        on_delete=models.CASCADE,
+        **NULLABLE,
+        related_name="stripe_product",
+    )
+    lesson = models.OneToOneField(
+        "lms.Lesson",
+        on_delete=models.CASCADE,
+        **NULLABLE,
+        related_name="stripe_product",
+    )
+    product_id = models.CharField(max_length=255, verbose_name="id продукта Stripe")
+    name = models.CharField(max_length=255, verbose_name="Название продукта")
+
+    def __str__(self):
+        return self.product_id
+
+    class Meta:
+        verbose_name = "Продукт Stripe"
+        verbose_name_plural = "Продукты Stripe"
+        constraints = [
+            models.CheckConstraint(
+                condition=models.Q(course__isnull=False, lesson__isnull=True)
+                | models.Q(course__isnull=True, lesson__isnull=False),
+                name="stripe_product_course_xor_lesson",
+            ),
+        ]
+
+
+class StripePrice(models.Model):
+    product = models.ForeignKey(
+        StripeProduct, on_delete=models.CASCADE, related_name="prices"
+    )
+    amount = models.PositiveIntegerField(verbose_name="Сумма в USD")
+    price_id = models.CharField(max_length=255, verbose_name="id цены Stripe")
+
+    def __str__(self):
+        return self.price_id
+
+    class Meta:
+        verbose_name = "Цена Stripe"
+        verbose_name_plural = "Цены Stripe"
+        constraints = [
+            models.UniqueConstraint(
+                fields=("product", "amount"), name="stripe_price_product_amount"
+            ),
+        ]
@@ -1,5 +1,7 @@
 from rest_framework import permissions
 
+from users.roles import is_moderator
+
 
 class IsModerator(permissions.BasePermission):
     """
@@ -7,7 +9,7 @@ class IsModerator(permissions.BasePermission):
     """
 
     def has_permission(self, request, view):
-        return request.user.groups.filter(name="moderator").exists()
+        return is_moderator(request.user)
 
 
 class IsOwner(permissions.BasePermission):
@@ -16,4 +18,4 @@ class IsOwner(permissions.BasePermission):
     """
 
     def has_object_permission(self, request, view, obj):
-        return obj.owner == request.user
+        return obj.owner_id is not None and obj.owner_id == request.user.pk
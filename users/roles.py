@@ -0,0 +1,43 @@
+from django.conf import settings
+from django.core.cache import cache
+
+MODERATOR = "moderator"
+
+
+def _roles_cache_key(user_id):
+    return f"user_roles:{user_id}"
+
+
+def get_user_roles(user):
+    """
+    Возвращает множество ролей (названий групп) пользователя.
+
+    Роли вычисляются один раз за запрос и сохраняются на объекте пользователя,
+    а между запросами хранятся в общем кэше. Кэш сбрасывается сигналами
+    при изменении групп пользователя.
+    """
+    if not user.is_authenticated:
+        return frozenset()
+    roles = getattr(user, "_roles_cache", None)
+    if roles is None:
+        key = _roles_cache_key(user.pk)
+        roles = cache.get(key)
+        if roles is None:
+            roles = frozenset(user.groups.values_list("name", flat=True))
+            cache.set(key, roles, settings.USER_ROLES_CACHE_TIMEOUT)
+        user._roles_cache = roles
+    return roles
+
+
+def is_moderator(user):
+    """
+    Проверяет, входит ли пользователь в группу модераторов.
+    """
+    return MODERATOR in get_user_roles(user)
+
+
+def invalidate_user_roles(user_ids):
+    """
+    Удаляет роли указанных пользователей из общего кэша.
+    """
+    cache.delete_many([_roles_cache_key(user_id) for user_id in user_ids])
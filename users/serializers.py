@@ -1,20 +1,61 @@
+from django.conf import settings
+from drf_spectacular.utils import extend_schema_field
 from rest_framework import serializers
+from rest_framework.fields import IntegerField
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
 
-from users.models import User, Payment, Subscription
+from users.authentication import AUTH_VERSION_CLAIM, ROLES_CLAIM, get_auth_version
+from users.models import User, Payment, Subscription, ExchangeRate
+from users.roles import get_user_roles
 
 
 class PaymentSerializer(serializers.ModelSerializer):
     class Meta:
         model = Payment
         fields = "__all__"
+        read_only_fields = ("exchange_rate", "exchange_rate_updated_at", "status")
+
+    def validate(self, attrs):
+        if not attrs.get("course") and not attrs.get("lesson"):
+            raise serializers.ValidationError("Укажите курс или урок для оплаты.")
+        return attrs
+
+
+class PaymentStatusSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Payment
+        fields = ("id", "status", "session_id", "link")
 
 
 class UserSerializer(serializers.ModelSerializer):
-    payments = PaymentSerializer(many=True, read_only=True)
+    """
+    Профиль пользователя с последними платежами и их общим количеством.
+    В поле payments попадают USER_RECENT_PAYMENTS_LIMIT последних платежей,
+    полный список доступен постранично в users/<id>/payments/.
+    """
+
+    payments = serializers.SerializerMethodField()
+    payments_count = serializers.SerializerMethodField()
 
     class Meta:
         model = User
-        fields = ("id", "email", "first_name", "last_name", "payments")
+        fields = (
+            "id",
+            "email",
+            "first_name",
+            "last_name",
+            "payments",
+            "payments_count",
+        )
+
+    @extend_schema_field(PaymentSerializer(many=True))
+    def get_payments(self, obj):
+        payments = obj.payments.order_by("-id")[: settings.USER_RECENT_PAYMENTS_LIMIT]
+        return PaymentSerializer(payments, many=True).data
+
+    @extend_schema_field(IntegerField)
+    def get_payments_count(self, obj):
+        return obj.payments.count()
 
 
 class UserPublicSerializer(serializers.ModelSerializer):
@@ -27,3 +68,36 @@ class SubscriptionSerializer(serializers.ModelSerializer):
     class Meta:
         model = Subscription
         fields = "__all__"
+
+
+class SubscriptionBulkSerializer(serializers.Serializer):
+    courses = serializers.ListField(
+        child=serializers.IntegerField(min_value=1), allow_empty=False, max_length=1000
+    )
+    subscribed = serializers.BooleanField()
+
+
+class ExchangeRateSerializer(serializers.ModelSerializer):
+    age = serializers.SerializerMethodField()
+
+    class Meta:
+        model = ExchangeRate
+        fields = ("currency", "value", "updated_at", "age")
+
+    @extend_schema_field(IntegerField)
+    def get_age(self, obj):
+        return int(obj.age.total_seconds())
+
+
+class RoleTokenObtainPairSerializer(TokenObtainPairSerializer):
+    """
+    Выдаёт токены с ролями пользователя и версией данных аутентификации.
+    Роли из токена используются, пока версия не изменилась.
+    """
+
+    @classmethod
+    def get_token(cls, user):
+        token = super().get_token(user)
+        token[ROLES_CLAIM] = sorted(get_user_roles(user))
+        token[AUTH_VERSION_CLAIM] = get_auth_version(user.pk)
+        return token
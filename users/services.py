@@ -1,38 +1,187 @@
+import logging
+from decimal import Decimal
+
 import requests
 import stripe
-from rest_framework import status
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+from kombu.exceptions import OperationalError
+from rest_framework.exceptions import APIException
+
+from config.metrics import observe_external_call
+from users.models import ExchangeRate, Payment, StripePrice, StripeProduct
+
+logger = logging.getLogger(__name__)
+
+stripe.api_key = settings.STRIPE_API_KEY
 
-from config.settings import STRIPE_API_KEY, CUR_API_KEY
+EXCHANGE_RATE_CURRENCY = "RUB"
+EXCHANGE_RATE_CACHE_KEY = f"exchange_rate:{EXCHANGE_RATE_CURRENCY}"
+EXCHANGE_RATE_REFRESH_LOCK_KEY = f"exchange_rate:{EXCHANGE_RATE_CURRENCY}:refreshing"
 
-stripe.api_key = STRIPE_API_KEY
 
+class ExchangeRateUnavailable(APIException):
+    status_code = 503
+    default_detail = "Курс валют временно недоступен, повторите попытку позже."
+    default_code = "exchange_rate_unavailable"
 
-def convert_rub_to_usd(amount):
-    usd_price = 90
-    response = requests.get(
-        f"https://api.currencyapi.com/v3/latest?apikey={CUR_API_KEY}&currencies=RUB"
+
+def fetch_exchange_rate():
+    """
+    Запрашивает актуальный курс рубля у currencyapi и сохраняет его в базе и кэше.
+    """
+    with observe_external_call("currencyapi", "latest"):
+        response = requests.get(
+            settings.CUR_API_URL,
+            params={
+                "apikey": settings.CUR_API_KEY,
+                "currencies": EXCHANGE_RATE_CURRENCY,
+            },
+            timeout=settings.CUR_API_TIMEOUT,
+        )
+        response.raise_for_status()
+    value = response.json()["data"][EXCHANGE_RATE_CURRENCY]["value"]
+    rate, _ = ExchangeRate.objects.update_or_create(
+        currency=EXCHANGE_RATE_CURRENCY,
+        defaults={"value": Decimal(str(value)), "updated_at": timezone.now()},
     )
-    if response.status_code == status.HTTP_200_OK:
-        usd_price = amount / response.json()["data"]["RUB"]["value"]
-    return int(usd_price)
+    cache.set(EXCHANGE_RATE_CACHE_KEY, rate, timeout=None)
+    return rate
+
+
+def get_exchange_rate():
+    """
+    Возвращает сохранённый курс рубля из кэша или базы.
+
+    Если курс старше EXCHANGE_RATE_TTL, он всё равно возвращается, а обновление
+    запускается в фоне; недоступность брокера Celery только логируется. Курс
+    старше EXCHANGE_RATE_MAX_AGE не используется. Синхронный запрос
+    к currencyapi выполняется только если курс ещё ни разу не был получен.
+    """
+    from users.tasks import refresh_exchange_rate
+
+    rate = cache.get(EXCHANGE_RATE_CACHE_KEY)
+    if rate is None:
+        rate = ExchangeRate.objects.filter(currency=EXCHANGE_RATE_CURRENCY).first()
+        if rate is None:
+            try:
+                return fetch_exchange_rate()
+            except (requests.RequestException, KeyError, ValueError) as error:
+                raise ExchangeRateUnavailable() from error
+        cache.set(EXCHANGE_RATE_CACHE_KEY, rate, timeout=None)
+    if rate.age > settings.EXCHANGE_RATE_TTL and cache.add(
+        EXCHANGE_RATE_REFRESH_LOCK_KEY, True, timeout=settings.CUR_API_TIMEOUT * 12
+    ):
+        try:
+            refresh_exchange_rate.apply_async(retry=False)
+        except OperationalError:
+            logger.warning("Failed to schedule exchange rate refresh", exc_info=True)
+            cache.delete(EXCHANGE_RATE_REFRESH_LOCK_KEY)
+    if rate.age > settings.EXCHANGE_RATE_MAX_AGE:
+        logger.error("Exchange rate is older than EXCHANGE_RATE_MAX_AGE: %s", rate.age)
+        raise ExchangeRateUnavailable()
+    return rate
+
+
+def convert_rub_to_usd(amount, rate=None):
+    if rate is None:
+        rate = get_exchange_rate()
+    return int(amount / rate.value)
 
 
 def create_stripe_product(product):
-    return stripe.Product.create(name=product)
+    with observe_external_call("stripe", "product.create"):
+        return stripe.Product.create(name=product)
 
 
-def create_stripe_price(amount, product):
-    return stripe.Price.create(
-        currency="usd",
-        unit_amount=amount * 100,
-        product=product.id,
-    )
+def create_stripe_price(amount, product_id):
+    with observe_external_call("stripe", "price.create"):
+        return stripe.Price.create(
+            currency="usd",
+            unit_amount=amount * 100,
+            product=product_id,
+        )
 
 
-def create_stripe_session(price):
-    session = stripe.checkout.Session.create(
-        success_url="http://localhost:8000/",
-        line_items=[{"price": price.id, "quantity": 1}],
-        mode="payment",
-    )
+def create_stripe_session(price_id):
+    with observe_external_call("stripe", "checkout.session.create"):
+        session = stripe.checkout.Session.create(
+            success_url="http://localhost:8000/",
+            line_items=[{"price": price_id, "quantity": 1}],
+            mode="payment",
+        )
     return session.get("id"), session.get("url")
+
+
+def get_stripe_price_id(item, amount):
+    """
+    Возвращает id цены Stripe для курса или урока и суммы в USD.
+
+    Продукты и цены Stripe создаются один раз и сохраняются в StripeProduct и
+    StripePrice, поэтому повторная покупка не требует обращений к Stripe.
+    Если название курса или урока изменилось, продукт создаётся заново.
+    """
+    lookup = {item._meta.model_name: item}
+    price_id = (
+        StripePrice.objects.filter(
+            **{f"product__{key}": value for key, value in lookup.items()},
+            product__name=item.title,
+            amount=amount,
+        )
+        .values_list("price_id", flat=True)
+        .first()
+    )
+    if price_id is not None:
+        return price_id
+
+    product = StripeProduct.objects.filter(**lookup, name=item.title).first()
+    if product is None:
+        stripe_product = create_stripe_product(item.title)
+        # Удаляется только продукт со старым названием: продукт с текущим
+        # названием мог быть создан параллельной покупкой
+        StripeProduct.objects.filter(**lookup).exclude(name=item.title).delete()
+        product, _ = StripeProduct.objects.get_or_create(
+            **lookup,
+            defaults={"product_id": stripe_product.id, "name": item.title},
+        )
+    stripe_price = create_stripe_price(amount, product.product_id)
+    price, _ = StripePrice.objects.get_or_create(
+        product=product, amount=amount, defaults={"price_id": stripe_price.id}
+    )
+    return price.price_id
+
+
+def process_payment(payment):
+    """
+    Конвертирует сумму платежа в USD и создаёт для него Stripe-сессию.
+
+    Сохраняет применённый курс, идентификатор сессии и ссылку на оплату
+    и переводит платёж в статус "готов".
+    """
+    rate = get_exchange_rate()
+    amount_in_usd = convert_rub_to_usd(payment.amount, rate)
+    price_id = get_stripe_price_id(payment.course or payment.lesson, amount_in_usd)
+
+    payment.session_id, payment.link = create_stripe_session(price_id)
+    payment.exchange_rate = rate.value
+    payment.exchange_rate_updated_at = rate.updated_at
+    payment.status = Payment.STATUS_READY
+    payment.save()
+    return payment
+
+
+def schedule_payment_session(payment):
+    """
+    Ставит в очередь задачу создания Stripe-сессии для ожидающего платежа.
+
+    Если брокер Celery недоступен, платёж сразу переводится в статус "ошибка",
+    чтобы он не остался ожидающим без задачи, которая его обработает.
+    """
+    from users.tasks import create_payment_session, mark_payment_failed
+
+    try:
+        create_payment_session.apply_async((payment.pk,), retry=False)
+    except OperationalError:
+        logger.exception("Failed to schedule payment %s session", payment.pk)
+        mark_payment_failed(payment.pk)
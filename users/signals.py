@@ -0,0 +1,52 @@
+from django.contrib.auth.models import Group
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from users.authentication import invalidate_user_auth
+from users.models import User
+from users.roles import invalidate_user_roles
+
+
+def invalidate_roles(user_ids):
+    """
+    Сбрасывает кэш ролей и роли, записанные в токенах пользователей.
+    """
+    user_ids = list(user_ids)
+    invalidate_user_roles(user_ids)
+    invalidate_user_auth(user_ids)
+
+
+@receiver(m2m_changed, sender=User.groups.through)
+def invalidate_roles_on_groups_change(
+    sender, instance, action, reverse, pk_set, **kwargs
+):
+    """
+    Сбрасывает кэш ролей при добавлении или удалении групп пользователя.
+    """
+    if not reverse:
+        if action in ("post_add", "post_remove", "post_clear"):
+            instance.__dict__.pop("_roles_cache", None)
+            invalidate_roles([instance.pk])
+    elif action in ("post_add", "post_remove"):
+        invalidate_roles(pk_set)
+    elif action == "pre_clear":
+        invalidate_roles(instance.user_set.values_list("id", flat=True))
+
+
+@receiver(post_save, sender=Group)
+@receiver(pre_delete, sender=Group)
+def invalidate_roles_on_group_change(sender, instance, **kwargs):
+    """
+    Сбрасывает кэш ролей участников группы при её переименовании или удалении.
+    """
+    invalidate_roles(instance.user_set.values_list("id", flat=True))
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_auth_on_user_change(sender, instance, **kwargs):
+    """
+    Сбрасывает закэшированного для аутентификации пользователя при его
+    изменении или удалении, в том числе при деактивации.
+    """
+    invalidate_user_auth([instance.pk])
@@ -1,9 +1,24 @@
+import logging
 from datetime import timedelta
 
+import stripe
 from celery import shared_task
+from django.conf import settings
+from django.core.cache import cache
 from django.utils import timezone
 
-from users.models import User
+from users.authentication import invalidate_user_auth
+from users.models import Payment, User
+from users.services import (
+    EXCHANGE_RATE_REFRESH_LOCK_KEY,
+    ExchangeRateUnavailable,
+    fetch_exchange_rate,
+    process_payment,
+)
+
+logger = logging.getLogger(__name__)
+
+INACTIVE_USERS_HIGH_WATER_MARK_KEY = "deactivate_inactive_users:threshold"
 
 
 @shared_task
@@ -13,11 +28,85 @@ def deactivate_inactive_users():
 
     Определяет пользователей, которые не заходили в систему в течение последних
     30 дней и имеют статус активного пользователя (is_active=True), и деактивирует их.
+
+    Граница предыдущего запуска сохраняется в кэше, поэтому каждый запуск
+    рассматривает только пользователей, пересёкших 30-дневную границу после него.
+    Обновление выполняется пачками по INACTIVE_USERS_BATCH_SIZE строк, после
+    каждой пачки сбрасывается кэш аутентификации её пользователей.
+    Возвращает количество деактивированных пользователей.
+    """
+    threshold = timezone.now() - timedelta(days=30)
+    inactive_users = User.objects.filter(is_active=True, last_login__lte=threshold)
+    previous_threshold = cache.get(INACTIVE_USERS_HIGH_WATER_MARK_KEY)
+    if previous_threshold is not None:
+        inactive_users = inactive_users.filter(last_login__gt=previous_threshold)
+
+    batch = inactive_users.values_list("pk", flat=True)
+    deactivated = 0
+    while user_ids := list(batch[: settings.INACTIVE_USERS_BATCH_SIZE]):
+        # Условие выборки повторяется в UPDATE: пользователь, вошедший
+        # в систему после выборки, не деактивируется
+        updated = inactive_users.filter(pk__in=user_ids).update(
+            is_active=False, updated_at=timezone.now()
+        )
+        if updated < len(user_ids):
+            user_ids = list(
+                User.objects.filter(pk__in=user_ids, is_active=False).values_list(
+                    "pk", flat=True
+                )
+            )
+        deactivated += updated
+        # UPDATE не отправляет сигналы, поэтому кэш аутентификации
+        # деактивированных пользователей сбрасывается явно
+        invalidate_user_auth(user_ids)
+
+    cache.set(INACTIVE_USERS_HIGH_WATER_MARK_KEY, threshold, timeout=None)
+    logger.info(
+        "Deactivated %d inactive users",
+        deactivated,
+        extra={"users_deactivated": deactivated},
+    )
+    return deactivated
+
+
+@shared_task
+def refresh_exchange_rate():
     """
-    month = timezone.now() - timedelta(days=30)
-    inactive_users = User.objects.filter(last_login__lte=month, is_active=True)
-    if inactive_users.exists():
-        inactive_users.update(is_active=False)
-        print(f"Пользователи деактивированы")
-    else:
-        print("Не активные пользователи не обнаружены.")
+    Обновляет сохранённый курс рубля к доллару.
+
+    Запускается по расписанию и при обращении к устаревшему курсу.
+    """
+    try:
+        fetch_exchange_rate()
+    finally:
+        cache.delete(EXCHANGE_RATE_REFRESH_LOCK_KEY)
+
+
+@shared_task(bind=True, max_retries=3, default_retry_delay=10)
+def create_payment_session(self, payment_id):
+    """
+    Создаёт Stripe-сессию для ожидающего платежа.
+
+    Выполняет конвертацию валюты и обращения к Stripe вне HTTP-запроса.
+    Ошибки Stripe и сервиса курсов валют повторяются; после исчерпания
+    повторных попыток, как и при любой другой ошибке, платёж переводится
+    в статус "ошибка", чтобы ожидающие его статуса клиенты не ждали до таймаута.
+    """
+    payment = Payment.objects.select_related("course", "lesson").get(pk=payment_id)
+    if payment.status != Payment.STATUS_PENDING:
+        return
+    try:
+        process_payment(payment)
+    except (stripe.error.StripeError, ExchangeRateUnavailable) as error:
+        if self.request.retries < self.max_retries:
+            raise self.retry(exc=error)
+        mark_payment_failed(payment_id)
+    except Exception:
+        mark_payment_failed(payment_id)
+        raise
+
+
+def mark_payment_failed(payment_id):
+    Payment.objects.filter(pk=payment_id, status=Payment.STATUS_PENDING).update(
+        status=Payment.STATUS_FAILED
+    )
@@ -1,3 +1,928 @@
-from django.test import TestCase
+import json
+import tempfile
+import time
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+from pathlib import Path
+from unittest.mock import Mock, call, patch
 
-# Create your tests here.
+import redis
+import requests
+import stripe
+from django.contrib.auth.models import Group
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import IntegrityError, connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from kombu.exceptions import OperationalError
+from rest_framework import status
+from rest_framework.test import APIClient, APITestCase
+from rest_framework_simplejwt.tokens import AccessToken
+
+from config.metrics import MetricsRegistry, RedisMetricsStore, registry
+from lms.models import Course, Lesson
+from users.authentication import (
+    CACHED_USER_FIELDS,
+    CachedJWTAuthentication,
+    get_auth_version,
+)
+from users.models import ExchangeRate, Payment, StripeProduct, Subscription, User
+from users.roles import MODERATOR, is_moderator
+from users.services import (
+    ExchangeRateUnavailable,
+    get_exchange_rate,
+    get_stripe_price_id,
+)
+from users.tasks import (
+    INACTIVE_USERS_HIGH_WATER_MARK_KEY,
+    create_payment_session,
+    deactivate_inactive_users,
+)
+
+
+class UserRolesTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.moderator_group = Group.objects.create(name="moderator")
+        self.user = User.objects.create(email="test@test.com", password="12345678")
+
+    def test_roles_cached_between_requests(self):
+        """
+        Проверяет, что роли берутся из кэша без запросов к базе.
+        """
+        self.user.groups.add(self.moderator_group)
+        self.assertTrue(is_moderator(User.objects.get(pk=self.user.pk)))
+
+        user = User.objects.get(pk=self.user.pk)
+        with self.assertNumQueries(0):
+            self.assertTrue(is_moderator(user))
+
+    def test_groups_change_invalidates_roles(self):
+        """
+        Проверяет, что изменение групп сбрасывает кэш ролей.
+        """
+        self.assertFalse(is_moderator(self.user))
+        self.user.groups.add(self.moderator_group)
+        self.assertTrue(is_moderator(self.user))
+        self.assertTrue(is_moderator(User.objects.get(pk=self.user.pk)))
+
+        self.moderator_group.user_set.remove(self.user)
+        self.assertFalse(is_moderator(User.objects.get(pk=self.user.pk)))
+
+
+class ModeratorRequestTest(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.moderator_group = Group.objects.create(name="moderator")
+        self.owner_user = User.objects.create(
+            email="test@test.com", password="12345678"
+        )
+        self.moderator_user = User.objects.create(
+            email="moderator@test.com", password="12345678"
+        )
+        self.moderator_user.groups.add(self.moderator_group)
+        self.course = Course.objects.create(
+            title="Test Course", description="Course description", owner=self.owner_user
+        )
+        self.client = APIClient()
+
+    def test_roles_resolved_once_per_request(self):
+        """
+        Проверяет, что группы модератора запрашиваются не более одного раза.
+        """
+        self.client.force_authenticate(user=User.objects.get(pk=self.moderator_user.pk))
+        cache.clear()
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(f"/learning/courses/{self.course.id}/")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        role_queries = [
+            query for query in context.captured_queries if "auth_group" in query["sql"]
+        ]
+        self.assertEqual(len(role_queries), 1)
+
+
+@patch("users.services.requests.get")
+class ExchangeRateTest(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_cold_start_fetches_rate_once(self, mock_get):
+        """
+        Проверяет, что курс запрашивается у API один раз и затем берётся из кэша.
+        """
+        mock_get.return_value.json.return_value = {"data": {"RUB": {"value": 100}}}
+
+        self.assertEqual(get_exchange_rate().value, Decimal("100"))
+        self.assertEqual(get_exchange_rate().value, Decimal("100"))
+        self.assertEqual(mock_get.call_count, 1)
+        self.assertIn("timeout", mock_get.call_args.kwargs)
+        self.assertTrue(ExchangeRate.objects.filter(currency="RUB").exists())
+
+    def test_cold_start_failure(self, mock_get):
+        """
+        Проверяет, что при недоступности API и отсутствии курса возвращается ошибка.
+        """
+        mock_get.side_effect = requests.ConnectionError
+        with self.assertRaises(ExchangeRateUnavailable):
+            get_exchange_rate()
+
+    @override_settings(CUR_API_TIMEOUT=2)
+    def test_api_settings_read_at_call_time(self, mock_get):
+        """
+        Проверяет, что параметры currencyapi берутся из настроек при вызове.
+        """
+        mock_get.return_value.json.return_value = {"data": {"RUB": {"value": 100}}}
+        get_exchange_rate()
+        self.assertEqual(mock_get.call_args.kwargs["timeout"], 2)
+
+    @patch("users.tasks.refresh_exchange_rate.apply_async")
+    def test_stale_rate_served_while_refreshing(self, mock_delay, mock_get):
+        """
+        Проверяет, что устаревший курс отдаётся сразу, а обновление идёт в фоне.
+        """
+        ExchangeRate.objects.create(
+            currency="RUB",
+            value=Decimal("95"),
+            updated_at=timezone.now() - timedelta(days=1),
+        )
+
+        self.assertEqual(get_exchange_rate().value, Decimal("95"))
+        self.assertEqual(get_exchange_rate().value, Decimal("95"))
+        mock_get.assert_not_called()
+        mock_delay.assert_called_once()
+
+    @patch(
+        "users.tasks.refresh_exchange_rate.apply_async", side_effect=OperationalError
+    )
+    def test_stale_rate_served_when_broker_down(self, mock_apply_async, mock_get):
+        """
+        Проверяет, что недоступность брокера не мешает отдать устаревший курс.
+        """
+        ExchangeRate.objects.create(
+            currency="RUB",
+            value=Decimal("95"),
+            updated_at=timezone.now() - timedelta(days=1),
+        )
+        with self.assertLogs("users.services", "WARNING"):
+            self.assertEqual(get_exchange_rate().value, Decimal("95"))
+        mock_apply_async.assert_called_once_with(retry=False)
+
+    @override_settings(EXCHANGE_RATE_MAX_AGE=timedelta(hours=12))
+    @patch("users.tasks.refresh_exchange_rate.apply_async")
+    def test_too_old_rate_unavailable(self, mock_apply_async, mock_get):
+        """
+        Проверяет, что курс старше EXCHANGE_RATE_MAX_AGE не используется.
+        """
+        ExchangeRate.objects.create(
+            currency="RUB",
+            value=Decimal("95"),
+            updated_at=timezone.now() - timedelta(days=1),
+        )
+        with self.assertLogs("users.services", "ERROR"):
+            with self.assertRaises(ExchangeRateUnavailable):
+                get_exchange_rate()
+        mock_apply_async.assert_called_once()
+
+
+class PaymentCreateTest(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create(email="test@test.com", password="12345678")
+        self.course = Course.objects.create(
+            title="Test Course", description="Course description", owner=self.user
+        )
+        self.rate = ExchangeRate.objects.create(
+            currency="RUB", value=Decimal("100"), updated_at=timezone.now()
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    @patch("users.services.create_stripe_session", return_value=("cs_1", "http://pay"))
+    @patch("users.services.create_stripe_price")
+    @patch("users.services.create_stripe_product")
+    def test_payment_records_applied_rate(self, mock_product, mock_price, mock_session):
+        """
+        Проверяет, что платёж сохраняет применённый курс и сумму в долларах.
+        """
+        mock_product.return_value.id = "prod_1"
+        mock_price.return_value.id = "price_1"
+        response = self.client.post(
+            "/users/payment/", {"course": self.course.id, "amount": 5000}
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+        payment = Payment.objects.get()
+        self.assertEqual(payment.exchange_rate, Decimal("100"))
+        self.assertEqual(payment.exchange_rate_updated_at, self.rate.updated_at)
+        self.assertEqual(payment.link, "http://pay")
+        self.assertEqual(payment.status, Payment.STATUS_READY)
+        self.assertEqual(mock_price.call_args.args[0], 50)
+
+    @patch("users.services.create_stripe_session", return_value=("cs_1", "http://pay"))
+    @patch("users.services.get_stripe_price_id", return_value="price_1")
+    @patch("users.tasks.create_payment_session.apply_async")
+    def test_async_payment(self, mock_apply_async, mock_price_id, mock_session):
+        """
+        Проверяет, что асинхронный платеж создается сразу, а ссылка появляется
+        после выполнения задачи.
+        """
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                "/users/payment/?mode=async", {"course": self.course.id, "amount": 5000}
+            )
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(response.data["status"], Payment.STATUS_PENDING)
+        mock_session.assert_not_called()
+
+        payment_id = response.data["id"]
+        mock_apply_async.assert_called_once_with((payment_id,), retry=False)
+        status_url = f"/users/payment/{payment_id}/status/"
+        self.assertEqual(response["Location"], status_url)
+        self.assertEqual(
+            self.client.get(status_url).data["status"], Payment.STATUS_PENDING
+        )
+
+        create_payment_session(payment_id)
+
+        response = self.client.get(status_url, {"wait": 5})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["status"], Payment.STATUS_READY)
+        self.assertEqual(response.data["link"], "http://pay")
+
+    @patch(
+        "users.tasks.create_payment_session.apply_async",
+        side_effect=OperationalError,
+    )
+    def test_async_payment_when_broker_down(self, mock_apply_async):
+        """
+        Проверяет, что при недоступном брокере асинхронный платеж
+        переводится в статус "ошибка", а не остается ожидающим.
+        """
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                "/users/payment/?mode=async", {"course": self.course.id, "amount": 5000}
+            )
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        mock_apply_async.assert_called_once()
+
+        payment_id = response.data["id"]
+        self.assertEqual(
+            Payment.objects.get(pk=payment_id).status, Payment.STATUS_FAILED
+        )
+        response = self.client.get(f"/users/payment/{payment_id}/status/")
+        self.assertEqual(response.data["status"], Payment.STATUS_FAILED)
+        self.assertNotIn("Retry-After", response)
+
+    @patch(
+        "users.services.create_stripe_product",
+        side_effect=stripe.error.APIConnectionError("Stripe недоступен"),
+    )
+    def test_sync_payment_error_fails_payment(self, mock_product):
+        """
+        Проверяет, что ошибка синхронного создания Stripe-сессии переводит
+        платёж в статус "ошибка", а не оставляет его ожидающим.
+        """
+        with self.assertRaises(stripe.error.APIConnectionError):
+            self.client.post(
+                "/users/payment/", {"course": self.course.id, "amount": 5000}
+            )
+        self.assertEqual(Payment.objects.get().status, Payment.STATUS_FAILED)
+
+    @patch("users.tasks.process_payment", side_effect=RuntimeError)
+    def test_unexpected_error_fails_payment(self, mock_process):
+        """
+        Проверяет, что непредвиденная ошибка задачи переводит платёж
+        в статус "ошибка", а не оставляет его ожидающим.
+        """
+        payment = Payment.objects.create(user=self.user, course=self.course)
+        with self.assertRaises(RuntimeError):
+            create_payment_session(payment.id)
+        payment.refresh_from_db()
+        self.assertEqual(payment.status, Payment.STATUS_FAILED)
+
+    @override_settings(PAYMENT_STATUS_MAX_WAIT=0)
+    def test_payment_status_wait_limited_by_settings(self):
+        """
+        Проверяет, что время ожидания статуса ограничено PAYMENT_STATUS_MAX_WAIT.
+        """
+        payment = Payment.objects.create(user=self.user, course=self.course)
+        start = time.monotonic()
+        response = self.client.get(f"/users/payment/{payment.id}/status/", {"wait": 5})
+        self.assertLess(time.monotonic() - start, 1)
+        self.assertEqual(response.data["status"], Payment.STATUS_PENDING)
+        self.assertEqual(response["Retry-After"], "1")
+
+    def test_payment_status_of_other_user(self):
+        """
+        Проверяет, что статус чужого платежа недоступен.
+        """
+        other_user = User.objects.create(email="other@test.com", password="12345678")
+        payment = Payment.objects.create(user=other_user, course=self.course)
+        response = self.client.get(f"/users/payment/{payment.id}/status/")
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_exchange_rate_endpoint(self):
+        """
+        Проверяет, что эндпоинт курса возвращает его значение и возраст.
+        """
+        response = self.client.get("/users/exchange-rate/")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["currency"], "RUB")
+        self.assertGreaterEqual(response.data["age"], 0)
+
+
+@patch("users.services.create_stripe_price")
+@patch("users.services.create_stripe_product")
+class StripePriceMappingTest(TestCase):
+    def setUp(self):
+        self.course = Course.objects.create(
+            title="Test Course", description="Course description"
+        )
+
+    def test_repeat_purchase_reuses_product_and_price(self, mock_product, mock_price):
+        """
+        Проверяет, что повторная покупка не создаёт новые продукт и цену в Stripe.
+        """
+        mock_product.return_value.id = "prod_1"
+        mock_price.return_value.id = "price_1"
+
+        self.assertEqual(get_stripe_price_id(self.course, 10), "price_1")
+        with self.assertNumQueries(1):
+            self.assertEqual(get_stripe_price_id(self.course, 10), "price_1")
+        mock_product.assert_called_once_with("Test Course")
+        mock_price.assert_called_once_with(10, "prod_1")
+
+        mock_price.return_value.id = "price_2"
+        self.assertEqual(get_stripe_price_id(self.course, 20), "price_2")
+        mock_product.assert_called_once()
+
+    def test_title_change_invalidates_mapping(self, mock_product, mock_price):
+        """
+        Проверяет, что после смены названия курса создаётся новый продукт.
+        """
+        mock_product.return_value.id = "prod_1"
+        mock_price.return_value.id = "price_1"
+        get_stripe_price_id(self.course, 10)
+
+        self.course.title = "Renamed Course"
+        self.course.save()
+        mock_product.return_value.id = "prod_2"
+        mock_price.return_value.id = "price_2"
+
+        self.assertEqual(get_stripe_price_id(self.course, 10), "price_2")
+        mock_product.assert_called_with("Renamed Course")
+        product = StripeProduct.objects.get()
+        self.assertEqual(product.product_id, "prod_2")
+        self.assertEqual(
+            list(product.prices.values_list("price_id", flat=True)), ["price_2"]
+        )
+
+    def test_concurrent_first_purchase_keeps_product(self, mock_product, mock_price):
+        """
+        Проверяет, что продукт, созданный параллельной первой покупкой,
+        не удаляется и используется для цены.
+        """
+
+        def create_concurrently(title):
+            StripeProduct.objects.create(
+                course=self.course, product_id="prod_1", name=title
+            )
+            return Mock(id="prod_2")
+
+        mock_product.side_effect = create_concurrently
+        mock_price.return_value.id = "price_1"
+
+        self.assertEqual(get_stripe_price_id(self.course, 10), "price_1")
+        mock_price.assert_called_once_with(10, "prod_1")
+        self.assertEqual(StripeProduct.objects.get().product_id, "prod_1")
+
+
+class DeactivateInactiveUsersTest(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def create_user(self, email, days_ago):
+        return User.objects.create(
+            email=email,
+            password="12345678",
+            last_login=timezone.now() - timedelta(days=days_ago),
+        )
+
+    @override_settings(INACTIVE_USERS_BATCH_SIZE=2)
+    def test_inactive_users_deactivated_in_batches(self):
+        """
+        Проверяет, что неактивные пользователи деактивируются пачками.
+        """
+        inactive = [self.create_user(f"old{i}@test.com", 40) for i in range(5)]
+        active = self.create_user("new@test.com", 1)
+
+        # Выборка id и UPDATE на каждую пачку и пустая выборка в конце
+        with self.assertNumQueries(7):
+            self.assertEqual(deactivate_inactive_users(), 5)
+
+        self.assertFalse(
+            User.objects.filter(
+                pk__in=[u.pk for u in inactive], is_active=True
+            ).exists()
+        )
+        active.refresh_from_db()
+        self.assertTrue(active.is_active)
+
+    def test_run_checks_only_users_after_previous_threshold(self):
+        """
+        Проверяет, что запуск рассматривает только пользователей, пересёкших
+        границу после предыдущего запуска.
+        """
+        cache.set(
+            INACTIVE_USERS_HIGH_WATER_MARK_KEY, timezone.now() - timedelta(days=31)
+        )
+        already_checked = self.create_user("checked@test.com", 40)
+        newly_inactive = self.create_user("new@test.com", 30.5)
+
+        self.assertEqual(deactivate_inactive_users(), 1)
+        already_checked.refresh_from_db()
+        newly_inactive.refresh_from_db()
+        self.assertTrue(already_checked.is_active)
+        self.assertFalse(newly_inactive.is_active)
+
+
+class SubscriptionToggleTest(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create(email="test@test.com", password="12345678")
+        self.course = Course.objects.create(
+            title="Test Course", description="Course description"
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def test_toggle_is_single_query(self):
+        """
+        Проверяет, что переключение подписки выполняется одним запросом.
+        """
+        with self.assertNumQueries(1):
+            self.assertTrue(Subscription.objects.toggle(self.user, self.course.id))
+        with self.assertNumQueries(1):
+            self.assertFalse(Subscription.objects.toggle(self.user, self.course.id))
+        self.assertFalse(Subscription.objects.exists())
+
+    def test_toggle_unknown_course(self):
+        """
+        Проверяет, что подписка на несуществующий курс возвращает 404.
+        """
+        response = self.client.post("/users/subs/", {"course_id": self.course.id + 1})
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertFalse(Subscription.objects.exists())
+
+    def test_duplicate_subscription_rejected(self):
+        """
+        Проверяет, что повторная подписка на курс запрещена ограничением.
+        """
+        Subscription.objects.create(user=self.user, course=self.course)
+        with self.assertRaises(IntegrityError):
+            Subscription.objects.create(user=self.user, course=self.course)
+
+
+class SubscriptionBulkTest(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create(email="test@test.com", password="12345678")
+        self.courses = [
+            Course.objects.create(title=f"Course {i}", description="description")
+            for i in range(3)
+        ]
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def test_bulk_subscribe_and_unsubscribe(self):
+        """
+        Проверяет массовую подписку и отписку с итогом по каждому курсу.
+        """
+        first, second, third = (course.id for course in self.courses)
+        Subscription.objects.create(user=self.user, course=self.courses[0])
+        missing = third + 1
+
+        response = self.client.post(
+            "/users/subs/bulk/",
+            {"courses": [first, second, missing], "subscribed": True},
+            format="json",
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            response.data["results"],
+            [
+                {"course": first, "status": "subscribed"},
+                {"course": second, "status": "subscribed"},
+                {"course": missing, "status": "not_found"},
+            ],
+        )
+        self.assertEqual(
+            set(self.user.subscriptions.values_list("course_id", flat=True)),
+            {first, second},
+        )
+
+        response = self.client.post(
+            "/users/subs/bulk/",
+            {"courses": [first, third], "subscribed": False},
+            format="json",
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            list(self.user.subscriptions.values_list("course_id", flat=True)), [second]
+        )
+
+    def test_bulk_requires_courses(self):
+        """
+        Проверяет, что пустой список курсов отклоняется.
+        """
+        response = self.client.post(
+            "/users/subs/bulk/", {"courses": [], "subscribed": True}, format="json"
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class UserPaymentsTest(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create(email="test@test.com", password="12345678")
+        self.other_user = User.objects.create(
+            email="other@test.com", password="12345678"
+        )
+        self.course = Course.objects.create(
+            title="Test Course", description="Course description", owner=self.user
+        )
+        self.payments = Payment.objects.bulk_create(
+            Payment(user=self.user, course=self.course, amount=100 + i)
+            for i in range(12)
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def test_user_list_paginated(self):
+        """
+        Проверяет, что список пользователей отдаётся постранично.
+        """
+        response = self.client.get("/users/?page_size=1")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["count"], 2)
+        self.assertEqual(len(response.data["results"]), 1)
+        self.assertIsNotNone(response.data["next"])
+
+    @override_settings(USER_RECENT_PAYMENTS_LIMIT=3)
+    def test_profile_recent_payments_bounded(self):
+        """
+        Проверяет, что в профиль попадают только последние платежи.
+        """
+        response = self.client.get(f"/users/users/{self.user.id}/")
+        self.assertEqual(response.data["payments_count"], 12)
+        self.assertEqual(
+            [payment["amount"] for payment in response.data["payments"]],
+            [111, 110, 109],
+        )
+
+    def test_payments_paginated(self):
+        """
+        Проверяет постраничный список платежей пользователя.
+        """
+        response = self.client.get(f"/users/users/{self.user.id}/payments/")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["count"], 12)
+        self.assertEqual(len(response.data["results"]), 10)
+        self.assertEqual(response.data["results"][0]["amount"], 111)
+
+    def test_payments_of_other_user(self):
+        """
+        Проверяет, что платежи другого пользователя недоступны.
+        """
+        response = self.client.get(f"/users/users/{self.other_user.id}/payments/")
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+
+class UserExportTest(APITestCase):
+    def setUp(self):
+        self.staff = User.objects.create(
+            email="staff@test.com", password="12345678", is_staff=True
+        )
+        self.user = User.objects.create(email="test@test.com", password="12345678")
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.staff)
+
+    def test_export_users(self):
+        """
+        Проверяет потоковую выгрузку пользователей без паролей.
+        """
+        response = self.client.get("/users/export/")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        content = b"".join(response.streaming_content).decode()
+        rows = [json.loads(line) for line in content.splitlines()]
+        self.assertEqual(
+            [row["email"] for row in rows], [u.email for u in (self.staff, self.user)]
+        )
+        self.assertNotIn("password", rows[0])
+
+    def test_deactivation_marks_user_updated(self):
+        """
+        Проверяет, что деактивация обновляет дату изменения пользователя.
+        """
+        User.objects.filter(pk=self.user.pk).update(
+            last_login=timezone.now() - timedelta(days=31),
+            updated_at=timezone.now() - timedelta(days=31),
+        )
+        deactivate_inactive_users()
+        self.user.refresh_from_db()
+        self.assertGreater(self.user.updated_at, timezone.now() - timedelta(days=1))
+
+    def test_export_forbidden_for_users(self):
+        """
+        Проверяет, что обычный пользователь не может выгружать пользователей.
+        """
+        self.client.force_authenticate(user=self.user)
+        response = self.client.get("/users/export/")
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+
+class BulkImportTest(TestCase):
+    fixtures_dir = Path(settings.BASE_DIR)
+
+    def setUp(self):
+        # Занимаем id из фикстур, чтобы проверить пересчёт внешних ключей
+        self.existing_user = User.objects.create(email="existing@test.com")
+        self.existing_course = Course.objects.create(title="Existing", description="")
+
+    def import_files(self, *files, **options):
+        out = StringIO()
+        call_command("bulk_import", *map(str, files), stdout=out, **options)
+        return out.getvalue()
+
+    def assert_fixtures_imported(self):
+        moderator = User.objects.get(email="test2@test.com")
+        self.assertEqual(
+            list(moderator.groups.values_list("name", flat=True)), ["moderator"]
+        )
+        course = Course.objects.get(title="Python разработчик")
+        self.assertEqual(course.owner.email, "test3@test.com")
+        self.assertEqual(course.lessons.count(), 5)
+        self.assertEqual(
+            Lesson.objects.filter(owner__email="admin@example.ru").count(), 1
+        )
+        self.assertEqual(Lesson.objects.filter(course__isnull=True).count(), 2)
+
+    def test_import_fixtures(self):
+        """
+        Проверяет загрузку фикстур в UTF-16 и UTF-8 с пересчётом id.
+        """
+        output = self.import_files(
+            *(
+                self.fixtures_dir / name
+                for name in ("groups.json", "users.json", "data_lms.json")
+            )
+        )
+        self.assert_fixtures_imported()
+        self.assertIn("Загружено 17 строк", output)
+
+    def test_import_ndjson_with_bulk_create(self):
+        """
+        Проверяет загрузку NDJSON через bulk_create небольшими пачками.
+        """
+        with tempfile.TemporaryDirectory() as directory:
+            files = []
+            for name in ("groups.json", "users.json", "data_lms.json"):
+                path = Path(directory) / f"{name}.ndjson"
+                objects = json.loads(
+                    (self.fixtures_dir / name)
+                    .read_bytes()
+                    .decode("utf-16" if name != "data_lms.json" else "utf-8-sig")
+                )
+                path.write_text(
+                    "\n".join(json.dumps(obj, ensure_ascii=False) for obj in objects),
+                    encoding="utf-8",
+                )
+                files.append(path)
+            self.import_files(*files, batch_size=3, no_copy=True)
+        self.assert_fixtures_imported()
+
+    def test_import_reuses_rows_with_same_unique_fields(self):
+        """
+        Проверяет, что объект с уже существующим уникальным значением
+        не загружается повторно, а ссылки переводятся на существующую строку.
+        """
+        output = self.import_files(
+            self.fixtures_dir / "groups.json", self.fixtures_dir / "data.json"
+        )
+        self.assertEqual(Group.objects.filter(name="moderator").count(), 1)
+        self.assertEqual(
+            list(
+                User.objects.get(email="test2@test.com").groups.values_list(
+                    "name", flat=True
+                )
+            ),
+            ["moderator"],
+        )
+        self.assertIn("auth.group: 1 строк, уже существуют: 1", output)
+
+
+@override_settings(METRICS_TOKEN="metrics-token", METRICS_ALLOWED_IPS=[])
+class MetricsTest(APITestCase):
+    def setUp(self):
+        cache.clear()
+        registry.clear()
+        self.user = User.objects.create(email="test@test.com", password="12345678")
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def get_metrics(self):
+        response = self.client.get(
+            "/metrics/", HTTP_AUTHORIZATION="Bearer metrics-token"
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.content.decode()
+
+    def test_request_latency(self):
+        """
+        Проверяет гистограмму времени запросов по маршруту.
+        """
+        self.client.get("/users/")
+        metrics = self.get_metrics()
+        self.assertIn("# TYPE http_request_duration_seconds histogram", metrics)
+        self.assertIn(
+            'http_request_duration_seconds_count{route="users:users_list",'
+            'method="GET",status="200"} 1',
+            metrics,
+        )
+        self.assertIn(
+            'http_request_duration_seconds_bucket{route="users:users_list",'
+            'method="GET",status="200",le="+Inf"} 1',
+            metrics,
+        )
+
+    @patch("users.services.requests.get", side_effect=requests.ConnectionError)
+    def test_external_call_errors(self, mock_get):
+        """
+        Проверяет учёт времени и ошибок обращений к currencyapi.
+        """
+        with self.assertRaises(ExchangeRateUnavailable):
+            get_exchange_rate()
+        metrics = self.get_metrics()
+        self.assertIn(
+            'external_call_errors_total{service="currencyapi",operation="latest"} 1',
+            metrics,
+        )
+        self.assertIn(
+            'external_call_duration_seconds_count{service="currencyapi",'
+            'operation="latest",outcome="error"} 1',
+            metrics,
+        )
+
+    def test_task_duration(self):
+        """
+        Проверяет учёт длительности и состояния задач Celery.
+        """
+        deactivate_inactive_users.apply()
+        self.assertIn(
+            'celery_task_duration_seconds_count{task="users.tasks.'
+            'deactivate_inactive_users",state="SUCCESS"} 1',
+            self.get_metrics(),
+        )
+
+    def test_metrics_access(self):
+        """
+        Проверяет, что метрики недоступны без токена даже с локального адреса,
+        но доступны сотруднику и с адреса из METRICS_ALLOWED_IPS.
+        """
+        response = self.client.get("/metrics/")
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        response = self.client.get("/metrics/", HTTP_AUTHORIZATION="Bearer wrong")
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+        with self.settings(METRICS_ALLOWED_IPS=["10.0.0.1"]):
+            response = self.client.get("/metrics/", REMOTE_ADDR="10.0.0.1")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        staff = User.objects.create(email="staff@test.com", is_staff=True)
+        self.client.force_login(staff)
+        self.assertEqual(self.client.get("/metrics/").status_code, status.HTTP_200_OK)
+
+    @patch("config.metrics.redis.Redis.from_url")
+    def test_redis_store(self, mock_from_url):
+        """
+        Проверяет запись и чтение метрик в Redis с ограниченным таймаутом.
+        """
+        store = RedisMetricsStore("redis://localhost:6379/1")
+        self.assertEqual(mock_from_url.call_args.kwargs["socket_timeout"], 0.1)
+        self.assertEqual(mock_from_url.call_args.kwargs["socket_connect_timeout"], 0.1)
+
+        client = mock_from_url.return_value
+        store.increment("requests", {"a": 1, "b": 0.5})
+        client.pipeline.return_value.hincrbyfloat.assert_has_calls(
+            [call("metrics:requests", "a", 1), call("metrics:requests", "b", 0.5)]
+        )
+        client.pipeline.return_value.execute.assert_called_once()
+
+        client.hgetall.return_value = {b"a": b"2", b"b": b"0.5"}
+        self.assertEqual(store.read("requests"), {"a": 2.0, "b": 0.5})
+        client.hgetall.assert_called_with("metrics:requests")
+
+    @patch("config.metrics.redis.Redis.from_url")
+    def test_unavailable_redis_pauses_recording(self, mock_from_url):
+        """
+        Проверяет, что после ошибки Redis запись метрик не выполняется
+        до истечения паузы и не прерывает обработку.
+        """
+        execute = mock_from_url.return_value.pipeline.return_value.execute
+        execute.side_effect = redis.TimeoutError
+        metrics_registry = MetricsRegistry()
+        metrics_registry._store = RedisMetricsStore("redis://localhost:6379/1")
+
+        with self.assertLogs("config.metrics", "WARNING"):
+            metrics_registry.increment("requests", {"a": 1})
+        metrics_registry.increment("requests", {"a": 1})
+        execute.assert_called_once()
+
+
+class CachedJWTAuthenticationTest(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create(
+            email="jwt@test.com",
+            is_active=True,
+            last_login=timezone.now() - timedelta(days=40),
+        )
+        self.user.set_password("12345678")
+        self.user.save()
+        self.moderators, _ = Group.objects.get_or_create(name=MODERATOR)
+        self.user.groups.add(self.moderators)
+
+    def login(self):
+        response = self.client.post(
+            "/users/login/", {"email": "jwt@test.com", "password": "12345678"}
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {response.data['access']}")
+        return response.data["access"]
+
+    def user_table_queries(self, captured):
+        return [
+            query["sql"]
+            for query in captured.captured_queries
+            if 'FROM "users_user"' in query["sql"] or "auth_group" in query["sql"]
+        ]
+
+    def test_repeated_requests_do_not_load_user(self):
+        """
+        Проверяет, что повторный запрос с токеном не загружает пользователя
+        и его группы из базы, а роли берутся из токена.
+        """
+        self.login()
+        self.client.get("/learning/courses/")
+        with CaptureQueriesContext(connection) as captured:
+            response = self.client.get("/learning/courses/")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(self.user_table_queries(captured), [])
+
+    def test_cached_user_has_no_password(self):
+        """
+        Проверяет, что в кэш попадают только нужные для запроса поля,
+        а остальные поля пользователя загружаются из базы при обращении.
+        """
+        token = AccessToken(self.login())
+        version = get_auth_version(self.user.pk)
+        self.client.get("/learning/courses/")
+        cached_fields = cache.get(f"auth_user:{self.user.pk}:{version}")
+        self.assertEqual(set(cached_fields), set(CACHED_USER_FIELDS))
+        self.assertNotIn("password", cached_fields)
+
+        user = CachedJWTAuthentication().get_user(token)
+        self.assertEqual(user.email, "jwt@test.com")
+        self.assertTrue(user.check_password("12345678"))
+
+    def test_deactivated_user_rejected(self):
+        """
+        Проверяет, что пакетная деактивация сбрасывает закэшированного
+        пользователя и следующий запрос отклоняется.
+        """
+        self.login()
+        self.assertEqual(
+            self.client.get("/learning/courses/").status_code, status.HTTP_200_OK
+        )
+        deactivate_inactive_users()
+        self.assertEqual(
+            self.client.get("/learning/courses/").status_code,
+            status.HTTP_401_UNAUTHORIZED,
+        )
+
+    def test_stale_roles_claim_ignored(self):
+        """
+        Проверяет, что после изменения групп роли из старого токена
+        не используются.
+        """
+        self.login()
+        self.assertEqual(
+            self.client.get("/learning/export/courses/").status_code,
+            status.HTTP_200_OK,
+        )
+        self.user.groups.remove(self.moderators)
+        self.assertEqual(
+            self.client.get("/learning/export/courses/").status_code,
+            status.HTTP_403_FORBIDDEN,
+        )
@@ -7,10 +7,15 @@ from users.views import (
     PaymentCreateAPIView,
     UserCreateAPIView,
     UserDestroyAPIView,
+    UserExportAPIView,
     UserListAPIView,
+    UserPaymentListAPIView,
     UserRetrieveAPIView,
     UserUpdateAPIView,
     SubscriptionAPIView,
+    SubscriptionBulkAPIView,
+    ExchangeRateAPIView,
+    PaymentStatusAPIView,
 )
 
 app_name = UsersConfig.name
@@ -22,10 +27,22 @@ urlpatterns = [
         UserCreateAPIView.as_view(permission_classes=[AllowAny]),
         name="register",
     ),
+    path("export/", UserExportAPIView.as_view(), name="users_export"),
     path("users/<int:pk>/", UserRetrieveAPIView.as_view(), name="user_detail"),
+    path(
+        "users/<int:pk>/payments/",
+        UserPaymentListAPIView.as_view(),
+        name="user_payments",
+    ),
     path("edit/<int:pk>/", UserUpdateAPIView.as_view(), name="user_edit"),
     path("delete/<int:pk>/", UserDestroyAPIView.as_view(), name="user_delete"),
     path("payment/", PaymentCreateAPIView.as_view(), name="payments"),
+    path(
+        "payment/<int:pk>/status/",
+        PaymentStatusAPIView.as_view(),
+        name="payment_status",
+    ),
+    path("exchange-rate/", ExchangeRateAPIView.as_view(), name="exchange_rate"),
     path(
         "login/",
         TokenObtainPairView.as_view(permission_classes=[AllowAny]),
@@ -37,4 +54,5 @@ urlpatterns = [
         name="token_refresh",
     ),
     path("subs/", SubscriptionAPIView.as_view(), name="subscription"),
+    path("subs/bulk/", SubscriptionBulkAPIView.as_view(), name="subscription_bulk"),
 ]
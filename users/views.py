@@ -1,26 +1,40 @@
-from django.shortcuts import get_object_or_404
+import time
+from functools import partial
+
+from django.conf import settings
+from django.db import transaction
+from django.urls import reverse
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import generics, status
 from rest_framework.decorators import action
-from rest_framework.exceptions import PermissionDenied
+from rest_framework.exceptions import NotFound, PermissionDenied, ValidationError
 from rest_framework.filters import OrderingFilter
 from rest_framework.generics import CreateAPIView
+from rest_framework.permissions import IsAdminUser
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
+from lms.cache import invalidate_tags, subscription_tag
+from lms.mixins import NDJSONExportMixin
 from lms.models import Course
+from lms.paginations import CustomPagination
 from users.models import User, Payment, Subscription
+from users.permissions import IsModerator
 from users.serializers import (
     UserSerializer,
     PaymentSerializer,
     UserPublicSerializer,
     SubscriptionSerializer,
+    SubscriptionBulkSerializer,
+    ExchangeRateSerializer,
+    PaymentStatusSerializer,
 )
 from users.services import (
-    create_stripe_session,
-    create_stripe_price,
-    convert_rub_to_usd, create_stripe_product,
+    get_exchange_rate,
+    process_payment,
+    schedule_payment_session,
 )
+from users.tasks import mark_payment_failed
 
 
 class UserCreateAPIView(generics.CreateAPIView):
@@ -45,11 +59,34 @@ class UserCreateAPIView(generics.CreateAPIView):
 
 class UserListAPIView(generics.ListAPIView):
     """
-    Представление для получения списка всех пользователей.
+    Представление для получения постраничного списка всех пользователей.
     """
 
-    queryset = User.objects.all()
+    queryset = User.objects.order_by("id")
     serializer_class = UserPublicSerializer
+    pagination_class = CustomPagination
+
+
+class UserExportAPIView(NDJSONExportMixin, generics.GenericAPIView):
+    """
+    Представление для потоковой выгрузки пользователей в NDJSON.
+    Доступно персоналу и модераторам; пароли и аватары не выгружаются.
+    """
+
+    queryset = User.objects.all()
+    permission_classes = [IsAdminUser | IsModerator]
+    export_fields = (
+        "id",
+        "email",
+        "first_name",
+        "last_name",
+        "phone",
+        "city",
+        "is_active",
+        "last_login",
+        "date_joined",
+        "updated_at",
+    )
 
 
 class UserUpdateAPIView(generics.UpdateAPIView):
@@ -94,6 +131,23 @@ class UserRetrieveAPIView(generics.RetrieveAPIView):
         return UserPublicSerializer
 
 
+class UserPaymentListAPIView(generics.ListAPIView):
+    """
+    Представление для получения постраничного списка платежей пользователя,
+    начиная с последних. Пользователь видит только свои платежи.
+    """
+
+    serializer_class = PaymentSerializer
+    pagination_class = CustomPagination
+
+    def get_queryset(self):
+        if getattr(self, "swagger_fake_view", False):
+            return Payment.objects.none()
+        if self.kwargs["pk"] != self.request.user.pk:
+            raise PermissionDenied("У вас нет прав на просмотр этих платежей.")
+        return Payment.objects.filter(user=self.request.user).order_by("-id")
+
+
 class UserDestroyAPIView(generics.DestroyAPIView):
     """
     Представление для удаления профиля текущего пользователя.
@@ -127,44 +181,165 @@ class SubscriptionAPIView(APIView):
         """
         Переключает статус подписки пользователя на указанный курс.
         Возвращает сообщение о добавлении или удалении подписки.
+
+        Переключение выполняется одним атомарным SQL-запросом.
         """
-        user = request.user
-        course_id = request.data.get("course")
-        course_item = get_object_or_404(Course, id=course_id)
-        subs_item = Subscription.objects.filter(user=user, course=course_item)
-        if subs_item.exists():
-            subs_item.delete()
-            message = "Подписка удалена"
-        else:
-            Subscription.objects.create(user=user, course=course_item)
-            message = "Подписка добавлена"
+        course_id = request.data.get("course_id", request.data.get("course"))
+        try:
+            course_id = int(course_id)
+        except (TypeError, ValueError):
+            raise ValidationError({"course_id": "Укажите id курса."})
+        subscribed = Subscription.objects.toggle(request.user, course_id)
+        if subscribed is None:
+            raise NotFound("Курс не найден.")
+        message = "Подписка добавлена" if subscribed else "Подписка удалена"
         return Response({"message": message}, status=status.HTTP_200_OK)
 
 
+class SubscriptionBulkAPIView(generics.GenericAPIView):
+    """
+    Представление для массовой подписки и отписки пользователя от курсов.
+    """
+
+    serializer_class = SubscriptionBulkSerializer
+
+    def post(self, request, *args, **kwargs):
+        """
+        Подписывает пользователя на переданные курсы или отписывает от них.
+
+        Существование курсов проверяется одним запросом, подписки создаются
+        через bulk_create и удаляются одним DELETE. Возвращает итог по каждому
+        курсу: subscribed, unsubscribed или not_found.
+        """
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        course_ids = list(dict.fromkeys(serializer.validated_data["courses"]))
+        subscribed = serializer.validated_data["subscribed"]
+
+        existing_ids = set(
+            Course.objects.filter(id__in=course_ids).values_list("id", flat=True)
+        )
+        with transaction.atomic():
+            if subscribed:
+                Subscription.objects.bulk_create(
+                    [
+                        Subscription(user=request.user, course_id=course_id)
+                        for course_id in existing_ids
+                    ],
+                    ignore_conflicts=True,
+                )
+            else:
+                Subscription.objects.filter(
+                    user=request.user, course_id__in=existing_ids
+                ).delete()
+        invalidate_tags(
+            [subscription_tag(request.user.pk, course_id) for course_id in existing_ids]
+        )
+
+        outcome = "subscribed" if subscribed else "unsubscribed"
+        results = [
+            {
+                "course": course_id,
+                "status": outcome if course_id in existing_ids else "not_found",
+            }
+            for course_id in course_ids
+        ]
+        return Response({"results": results}, status=status.HTTP_200_OK)
+
+
 class PaymentCreateAPIView(CreateAPIView):
     """
     Представление для создания платежа и формирования Stripe-сессии для обработки.
+
+    Если передан параметр ?mode=async или заголовок "Prefer: respond-async",
+    платеж сохраняется в статусе "ожидает" и сразу возвращается ответ 202,
+    а Stripe-сессия создается задачей Celery. Ссылку на оплату можно получить
+    через эндпоинт статуса платежа.
     """
 
     serializer_class = PaymentSerializer
     queryset = Payment.objects.all()
 
+    def is_async(self):
+        mode = self.request.query_params.get("mode")
+        prefer = self.request.headers.get("Prefer", "")
+        return mode == "async" or "respond-async" in prefer
+
+    def create(self, request, *args, **kwargs):
+        response = super().create(request, *args, **kwargs)
+        if self.is_async():
+            response.status_code = status.HTTP_202_ACCEPTED
+            response["Location"] = reverse(
+                "users:payment_status", kwargs={"pk": response.data["id"]}
+            )
+        return response
+
     def perform_create(self, serializer):
         """
-        Сохраняет платеж, конвертирует сумму в USD, создает объект цены в Stripe
-        и генерирует Stripe-сессию. Сохраняет идентификатор сессии и ссылку на оплату.
+        Сохраняет платеж и формирует для него Stripe-сессию: сразу или
+        в фоновой задаче, в зависимости от режима. Если сессию не удалось
+        создать или поставить задачу в очередь, платеж переводится
+        в статус "ошибка".
         """
         payment = serializer.save(user=self.request.user)
+        if self.is_async():
+            transaction.on_commit(partial(schedule_payment_session, payment))
+            return
+        try:
+            process_payment(payment)
+        except Exception:
+            mark_payment_failed(payment.pk)
+            raise
 
-        amount_in_usd = convert_rub_to_usd(payment.amount)
 
-        course = Course.objects.get(id=payment.course.id)
-        name = course.title
-        product = create_stripe_product(name)
-        price = create_stripe_price(amount_in_usd, product)
+class PaymentStatusAPIView(generics.RetrieveAPIView):
+    """
+    Представление для получения статуса платежа и ссылки на оплату.
+
+    Параметр ?wait=<секунды> включает long-polling: ответ возвращается, как только
+    платеж перестает ожидать ссылку, но не позже указанного времени и
+    PAYMENT_STATUS_MAX_WAIT. Пока платеж ожидает ссылку, заголовок Retry-After
+    подсказывает клиенту, когда повторить запрос.
+    """
+
+    serializer_class = PaymentStatusSerializer
+    poll_interval = 0.5
+    retry_after = 1
+
+    def retrieve(self, request, *args, **kwargs):
+        response = super().retrieve(request, *args, **kwargs)
+        if response.data["status"] == Payment.STATUS_PENDING:
+            response["Retry-After"] = self.retry_after
+        return response
+
+    def get_queryset(self):
+        if getattr(self, "swagger_fake_view", False):
+            return Payment.objects.none()
+        return Payment.objects.filter(user=self.request.user)
+
+    def get_wait(self):
+        try:
+            wait = float(self.request.query_params.get("wait", 0))
+        except ValueError:
+            raise ValidationError({"wait": "Укажите время ожидания в секундах."})
+        return min(max(wait, 0), settings.PAYMENT_STATUS_MAX_WAIT)
+
+    def get_object(self):
+        payment = super().get_object()
+        deadline = time.monotonic() + self.get_wait()
+        while payment.status == Payment.STATUS_PENDING and time.monotonic() < deadline:
+            time.sleep(self.poll_interval)
+            payment.refresh_from_db(fields=("status", "session_id", "link"))
+        return payment
+
+
+class ExchangeRateAPIView(generics.GenericAPIView):
+    """
+    Представление для получения текущего курса рубля и его возраста.
+    """
 
-        session_id, payment_link = create_stripe_session(price)
+    serializer_class = ExchangeRateSerializer
 
-        payment.session_id = session_id
-        payment.link = payment_link
-        payment.save()
+    def get(self, request, *args, **kwargs):
+        serializer = self.get_serializer(get_exchange_rate())
+        return Response(serializer.data)